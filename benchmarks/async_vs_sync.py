@@ -0,0 +1,92 @@
+"""
+Сравнение пропускной способности GET /workouts/ на синхронном (Session + threadpool)
+и асинхронном (AsyncSession + aiosqlite) путях при 200 одновременных клиентах.
+
+    python -m benchmarks.async_vs_sync --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import json
+from typing import Annotated
+
+from fastapi import Depends, FastAPI, HTTPException
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, lazyload, sessionmaker
+
+from benchmarks.common import async_session_factory, auth_headers, run_load, seed_database, temp_database
+from core.config import SECRET_KEY, ALGORITHM
+from core.database import get_db
+from core.security import oauth2_scheme
+from main import app as async_app
+from models.users import User
+from models.workouts import Workout
+
+
+def build_sync_app(sync_url: str, pool_size: int) -> FastAPI:
+    """Прежний синхронный путь: def-обработчики, каждый занимает слот threadpool на время запроса."""
+    # Соединение берётся в зависимости и держится, пока запрос ждёт слот threadpool под обработчик;
+    # при пуле меньше числа клиентов синхронный путь упирается в QueuePool timeout
+    engine = create_engine(sync_url, connect_args={"check_same_thread": False},
+                           pool_size=pool_size, max_overflow=0)
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    app = FastAPI()
+
+    def get_sync_db():
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get_sync_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_sync_db)):
+        if token.startswith("Bearer "):
+            token = token[len("Bearer "):].strip()
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user = db.query(User).filter(User.email == payload.get("sub")).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @app.get("/workouts/")
+    def get_workouts(current_user=Depends(get_sync_user), db: Session = Depends(get_sync_db)):
+        # lazyload воспроизводит прежнюю загрузку упражнений отдельным запросом на тренировку
+        workouts = db.query(Workout).options(lazyload(Workout.exercises)).filter(
+            Workout.user_id == current_user.id).all()
+        return [w.to_dict() for w in workouts]
+
+    return app
+
+
+async def main(args):
+    sync_url, async_url = temp_database("async_vs_sync")
+    emails = seed_database(sync_url, args.users, args.workouts, args.exercises)
+    headers = auth_headers(emails)
+
+    engine, session_factory = async_session_factory(async_url)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    async_app.dependency_overrides[get_db] = override_get_db
+    results = {
+        "sync": await run_load(build_sync_app(sync_url, args.concurrency), "GET", "/workouts/", headers,
+                               args.concurrency, args.requests),
+        "async": await run_load(async_app, "GET", "/workouts/", headers, args.concurrency, args.requests),
+    }
+    async_app.dependency_overrides.pop(get_db)
+    await engine.dispose()
+
+    results["speedup"] = round(results["async"]["rps"] / results["sync"]["rps"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--workouts", type=int, default=20, help="тренировок на пользователя")
+    parser.add_argument("--exercises", type=int, default=3, help="упражнений на тренировку")
+    asyncio.run(main(parser.parse_args()))
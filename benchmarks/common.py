@@ -0,0 +1,137 @@
+"""Общие помощники бенчмарков: временная БД, наполнение данными и нагрузочный клиент."""
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from itertools import islice
+
+import httpx
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.database import Base
+from core.security import AuthenticatedUser, create_user_header, get_password_hash
+from models.associations import workout_exercises
+from models.exercises import Exercise
+from models.users import User
+from models.workouts import Workout
+
+
+def temp_database(name: str):
+    path = os.path.join(tempfile.mkdtemp(prefix="fitness-bench-"), f"{name}.db")
+    return f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+
+
+def bench_emails(users: int) -> list[str]:
+    return [f"bench{i}@example.com" for i in range(users)]
+
+
+def linked_exercise_id(workout_id: int, position: int, total_exercises: int) -> int:
+    """id упражнения на позиции position в тренировке workout_id (та же формула, что при наполнении)."""
+    return (workout_id + position) % total_exercises + 1
+
+
+def _insert_chunked(conn, table, rows, chunk_size: int):
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        conn.execute(insert(table), chunk)
+
+
+def seed_database(sync_url: str, users: int, workouts_per_user: int, exercises_per_workout: int,
+                  exercises: int | None = None, chunk_size: int = 50_000):
+    """
+    Создаёт схему и наполняет её через Core insert порциями по chunk_size строк; возвращает email пользователей.
+    Тренировки пользователя i (с нуля) получают id i * workouts_per_user + 1 ... (i + 1) * workouts_per_user.
+    """
+    engine = create_engine(sync_url)
+    Base.metadata.create_all(bind=engine)
+    emails = bench_emails(users)
+    password_hash = get_password_hash("bench")
+    total_exercises = exercises or max(exercises_per_workout, 1) * 10
+    with engine.begin() as conn:
+        _insert_chunked(conn, User, (
+            {"name": f"Bench {i}", "email": email, "password_hash": password_hash,
+             "experience_level": "beginner", "goal": "endurance"}
+            for i, email in enumerate(emails)
+        ), chunk_size)
+        _insert_chunked(conn, Exercise, (
+            {"name": f"Exercise {i}", "description": "bench", "calories_per_minute": 5 + i % 10,
+             "exercise_type": "cardio"}
+            for i in range(total_exercises)
+        ), chunk_size)
+        _insert_chunked(conn, Workout, (
+            {"name": f"Workout {u}-{w}", "description": "bench", "duration_minutes": 30,
+             "workout_type": "strength", "user_id": u + 1}
+            for u in range(users) for w in range(workouts_per_user)
+        ), chunk_size)
+        _insert_chunked(conn, workout_exercises, (
+            {"workout_id": wid, "exercise_id": linked_exercise_id(wid, e, total_exercises)}
+            for wid in range(1, users * workouts_per_user + 1) for e in range(exercises_per_workout)
+        ), chunk_size)
+    engine.dispose()
+    return emails
+
+
+def async_session_factory(async_url: str):
+    engine = create_async_engine(async_url)
+    return engine, async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False,
+                                      expire_on_commit=False)
+
+
+def auth_headers(emails):
+    # Пользователи вставлены по порядку, поэтому id = позиция + 1
+    return [{"Authorization": create_user_header(AuthenticatedUser(i + 1, email, 0))}
+            for i, email in enumerate(emails)]
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+async def run_requests(app, make_request, concurrency: int, total: int):
+    """
+    Гоняет total запросов из concurrency параллельных клиентов; make_request(i) возвращает
+    (method, path, kwargs для httpx) i-го запроса. Возвращает сводку с перцентилями и статусами.
+    """
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    statuses = Counter()
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                method, path, kwargs = make_request(i)
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_load(app, method: str, path: str, headers: list, concurrency: int, total: int):
+    """Гоняет total одинаковых запросов из concurrency параллельных клиентов; возвращает сводку."""
+    return await run_requests(app, lambda i: (method, path, {"headers": headers[i % len(headers)]}),
+                              concurrency, total)
@@ -0,0 +1,242 @@
+"""
+Нагрузочный прогон всех маршрутов routes/users.py, routes/workouts.py и routes/auth.py
+на заранее наполненной базе. По каждому маршруту — p50/p95/p99, пропускная способность и статусы;
+результат пишется в JSON и сравнивается с сохранённым базовым прогоном.
+
+    python -m benchmarks.endpoints --scale small --requests 500
+    python -m benchmarks.endpoints --scale large --db /data/bench-large.db --output results.json \\
+        --baseline benchmarks/results/baseline.json
+
+Масштабы: small — 1k пользователей / 20k тренировок / 2k упражнений / 80k связей,
+large — 100k / 5M / 200k / 20M. С --db база наполняется один раз и переиспользуется
+(записывающие сценарии от прогона к прогону немного её меняют).
+Параллельность маршрута ограничена его лимитом в ADMISSION_RULES, чтобы мерить обработку, а не отказы.
+Выход с кодом 1, если p95 какого-либо маршрута вырос больше чем в --threshold раз относительно базового.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.common import (async_session_factory, auth_headers, bench_emails, linked_exercise_id,
+                               run_requests, seed_database, temp_database)
+from core.admission import AdmissionControlMiddleware
+from core.database import apply_sqlite_profile, get_db, get_session_factory, read_session_factory, session_router
+from core.security import get_password_hash
+from main import app
+from models.users import User
+from services.user_stats import rebuild_user_stats
+
+SCALES = {
+    "small": {"users": 1_000, "workouts": 20, "exercises": 2_000, "links": 4},
+    "large": {"users": 100_000, "workouts": 50, "exercises": 200_000, "links": 4},
+}
+
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), "results", "endpoints.json")
+
+
+async def seed(sync_url: str, session_factory, scale: dict):
+    """Наполняет базу и пересчитывает user_stats (Core insert мимо apply_delta)."""
+    started = time.perf_counter()
+    seed_database(sync_url, scale["users"], scale["workouts"], scale["links"], exercises=scale["exercises"])
+    async with session_factory() as db:
+        await rebuild_user_stats(db)
+        await db.commit()
+    print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def add_victims(sync_url: str, run_id: str, count: int) -> dict:
+    """Отдельные пользователи без тренировок для PUT/DELETE /users/{email}: каждый запрос — свой пользователь."""
+    password_hash = get_password_hash("bench")
+    victims = {kind: [f"{kind}-{run_id}-{i}@example.com" for i in range(count)] for kind in ("put", "delete")}
+    engine = create_engine(sync_url)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"name": "Victim", "email": email, "password_hash": password_hash,
+             "experience_level": "beginner", "goal": "endurance"}
+            for emails in victims.values() for email in emails
+        ])
+    engine.dispose()
+    return victims
+
+
+def build_scenarios(scale: dict, emails: list, headers: list, victims: dict, run_id: str) -> list:
+    """
+    Сценарии в порядке прогона: сначала чтения, затем записи, в конце удаления.
+    Запрос i работает от имени пользователя i % len(headers) и перебирает его тренировки,
+    поэтому изменяющие сценарии не задевают одни и те же строки, пока хватает тренировок.
+    """
+    active = len(headers)
+    per_user = scale["workouts"]
+    links = scale["links"]
+    total_exercises = scale["exercises"]
+
+    def user(i):
+        return i % active
+
+    def workout(i, offset=0):
+        # Тренировки пользователя u имеют id u * per_user + 1 ... (u + 1) * per_user
+        return user(i) * per_user + (i // active + offset) % per_user + 1
+
+    def auth(i):
+        return {"headers": headers[user(i)]}
+
+    def workout_body(i):
+        return {"name": f"Bench {run_id}-{i}", "description": "bench", "duration_minutes": 40,
+                "workout_type": "cardio"}
+
+    def exercise_body(i):
+        return {"name": f"Bench exercise {run_id}-{i}", "calories_per_minute": 7, "exercise_type": "strength"}
+
+    def import_body(i):
+        return "\n".join(json.dumps({**workout_body(i), "exercises": [exercise_body(i)]}) for _ in range(10))
+
+    def user_body(email):
+        return {"name": "Updated", "email": email, "experience_level": "advanced", "goal": "muscle_gain",
+                "password": "bench"}
+
+    scenarios = [
+        ("GET /users/", lambda i: ("GET", "/users/", {"params": {"limit": 50}})),
+        ("GET /users/{user_email}", lambda i: ("GET", f"/users/{emails[user(i)]}", auth(i))),
+        ("GET /workouts/", lambda i: ("GET", "/workouts/", {**auth(i), "params": {"limit": 50}})),
+        ("GET /workouts/stats", lambda i: ("GET", "/workouts/stats", {**auth(i), "params": {"bucket": "month"}})),
+        ("GET /workouts/summary", lambda i: ("GET", "/workouts/summary", auth(i))),
+        ("GET /workouts/export", lambda i: ("GET", "/workouts/export", auth(i))),
+        ("GET /workouts/{workout_id}", lambda i: ("GET", f"/workouts/{workout(i)}", auth(i))),
+        ("GET /workouts/{workout_id}/exercises",
+         lambda i: ("GET", f"/workouts/{workout(i)}/exercises", auth(i))),
+        ("GET /auth/hashing-stats", lambda i: ("GET", "/auth/hashing-stats", auth(i))),
+        ("POST /auth/login",
+         lambda i: ("POST", "/auth/login", {"params": {"email": emails[user(i)], "password": "bench"}})),
+        ("POST /auth/signup",
+         lambda i: ("POST", "/auth/signup", {"json": user_body(f"signup-{run_id}-{i}@example.com")})),
+        ("PUT /users/{user_email}",
+         lambda i: ("PUT", f"/users/{victims['put'][i]}", {"json": user_body(victims["put"][i])})),
+        ("POST /workouts/", lambda i: ("POST", "/workouts/", {**auth(i), "json": workout_body(i)})),
+        ("POST /workouts/bulk",
+         lambda i: ("POST", "/workouts/bulk",
+                    {**auth(i), "json": [{**workout_body(i), "exercises": [exercise_body(i)]}] * 10})),
+        ("POST /workouts/import",
+         lambda i: ("POST", "/workouts/import", {**auth(i), "content": import_body(i)})),
+        ("PUT /workouts/{workout_id}",
+         lambda i: ("PUT", f"/workouts/{workout(i, 1)}", {**auth(i), "json": workout_body(i)})),
+        ("POST /workouts/{workout_id}/exercises",
+         lambda i: ("POST", f"/workouts/{workout(i, 2)}/exercises", {**auth(i), "json": exercise_body(i)})),
+    ]
+    if links:
+        scenarios += [
+            ("GET /workouts/{workout_id}/exercises/{exercise_id}",
+             lambda i: ("GET", f"/workouts/{workout(i)}/exercises/"
+                               f"{linked_exercise_id(workout(i), 0, total_exercises)}", auth(i))),
+            # Упражнение на позиции links ещё не связано с тренировкой
+            ("POST /workouts/{workout_id}/add-exercise",
+             lambda i: ("POST", f"/workouts/{workout(i, 3)}/add-exercise",
+                        {**auth(i), "params": {"exercise_id": linked_exercise_id(workout(i, 3), links,
+                                                                                 total_exercises)}})),
+            ("PUT /workouts/{workout_id}/exercises/{exercise_id}",
+             lambda i: ("PUT", f"/workouts/{workout(i, 4)}/exercises/"
+                               f"{linked_exercise_id(workout(i, 4), 0, total_exercises)}",
+                        {**auth(i), "json": exercise_body(i)})),
+            ("DELETE /workouts/{workout_id}/exercises/{exercise_id}",
+             lambda i: ("DELETE", f"/workouts/{workout(i, 5)}/exercises/"
+                                  f"{linked_exercise_id(workout(i, 5), links - 1, total_exercises)}", auth(i))),
+        ]
+    scenarios += [
+        ("DELETE /workouts/{workout_id}", lambda i: ("DELETE", f"/workouts/{workout(i, 6)}", auth(i))),
+        ("DELETE /users/{user_email}", lambda i: ("DELETE", f"/users/{victims['delete'][i]}", {})),
+    ]
+    return scenarios
+
+
+def compare(routes: dict, baseline: dict, threshold: float) -> list:
+    """Маршруты, у которых p95 вырос больше чем в threshold раз относительно базового прогона."""
+    regressions = []
+    for name, current in routes.items():
+        previous = baseline.get("routes", {}).get(name)
+        if previous and previous["p95_ms"] > 0 and current["p95_ms"] / previous["p95_ms"] > threshold:
+            regressions.append({"route": name, "baseline_p95_ms": previous["p95_ms"],
+                                "p95_ms": current["p95_ms"],
+                                "ratio": round(current["p95_ms"] / previous["p95_ms"], 2)})
+    return regressions
+
+
+async def main(args) -> int:
+    scale = dict(SCALES[args.scale])
+    if args.db:
+        path = os.path.abspath(args.db)
+        sync_url, async_url = f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+    else:
+        sync_url, async_url = temp_database("endpoints")
+    engine, session_factory = async_session_factory(async_url)
+    apply_sqlite_profile(engine.sync_engine)
+    # GET-маршруты читают через отдельный read-only движок, как в приложении
+    read_engine = create_async_engine(async_url.replace(":///", ":///file:", 1) + "?mode=ro&uri=true")
+    apply_sqlite_profile(read_engine.sync_engine, read_only=True)
+    if not args.db or not os.path.exists(args.db):
+        await seed(sync_url, session_factory, scale)
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    emails = bench_emails(min(scale["users"], args.requests))
+    headers = auth_headers(emails)
+    victims = add_victims(sync_url, run_id, args.requests)
+
+    routed_get_db, routed_session_factory = session_router(session_factory,
+                                                           read_session_factory(engine, read_engine))
+    app.dependency_overrides[get_db] = routed_get_db
+    app.dependency_overrides[get_session_factory] = routed_session_factory
+
+    admission = AdmissionControlMiddleware(app)
+    routes = {}
+    try:
+        for name, make_request in build_scenarios(scale, emails, headers, victims, run_id):
+            if args.route and not any(part in name for part in args.route):
+                continue
+            # Больше клиентов, чем пропускает допуск, дало бы замер отказов 503, а не самого маршрута
+            limiter = admission.limiter_for(make_request(0)[1])
+            concurrency = min(args.concurrency, limiter.max_concurrent) if limiter else args.concurrency
+            routes[name] = {**await run_requests(app, make_request, concurrency, args.requests),
+                            "concurrency": concurrency}
+            print(f"{name:55} p50 {routes[name]['p50_ms']:>8} ms  p95 {routes[name]['p95_ms']:>8} ms  "
+                  f"p99 {routes[name]['p99_ms']:>8} ms  {routes[name]['rps']:>8} rps  "
+                  f"errors {routes[name]['errors']}", file=sys.stderr)
+    finally:
+        app.dependency_overrides.pop(get_db)
+        app.dependency_overrides.pop(get_session_factory)
+        await engine.dispose()
+        await read_engine.dispose()
+
+    report = {
+        "meta": {"scale": args.scale, **scale, "requests": args.requests, "concurrency": args.concurrency,
+                 "started_at": run_id, "python": sys.version.split()[0]},
+        "routes": routes,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(routes, json.load(f), args.threshold)
+        print(json.dumps({"regressions": regressions}, indent=2))
+        return 1 if regressions else 0
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--db", help="файл базы; наполняется при первом запуске и переиспользуется")
+    parser.add_argument("--requests", type=int, default=1000, help="запросов на маршрут")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route", action="append", help="гонять только маршруты, содержащие подстроку")
+    parser.add_argument("--output", default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="допустимый рост p95 относительно базового")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,84 @@
+"""
+Стоимость сериализации списка тренировок: путь FastAPI по умолчанию (dict → валидация по response_model →
+jsonable_encoder → json.dumps) против json_response (dict → orjson за один проход).
+Обе ручки отдают одни и те же заранее загруженные из БД тренировки, так что разница — только сериализация;
+to_dict() вызывается в обеих на каждый запрос.
+
+    python -m benchmarks.serialization --workouts 1000 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from benchmarks.common import async_session_factory, seed_database, temp_database
+from core.responses import json_response
+from models.workouts import Workout
+from schemas.workouts import WorkoutPage
+from services.exercises import get_workout_exercise_dicts
+
+
+async def load_workouts(async_url: str):
+    engine, session_factory = async_session_factory(async_url)
+    async with session_factory() as db:
+        workouts = (await db.execute(select(Workout).order_by(Workout.id))).scalars().all()
+        exercises = await get_workout_exercise_dicts(db, [w.id for w in workouts])
+    await engine.dispose()
+    return workouts, exercises
+
+
+def build_app(workouts, exercises) -> FastAPI:
+    app = FastAPI()
+
+    def page():
+        return {"items": [w.to_dict(exercises[w.id]) for w in workouts], "next_cursor": None}
+
+    @app.get("/validated", response_model=WorkoutPage)
+    async def validated():
+        return page()
+
+    @app.get("/orjson", response_model=WorkoutPage)
+    async def fast():
+        return json_response(page())
+
+    return app
+
+
+async def measure(app, path: str, requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        body = (await client.get(path)).content
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for _ in range(requests):
+            response = await client.get(path)
+            assert response.status_code == 200
+        cpu, wall = time.process_time() - cpu_started, time.perf_counter() - wall_started
+    return {
+        "cpu_ms_per_request": round(cpu / requests * 1000, 2),
+        "wall_ms_per_request": round(wall / requests * 1000, 2),
+        "body_bytes": len(body),
+        "items": len(json.loads(body)["items"]),
+    }
+
+
+async def main(args):
+    sync_url, async_url = temp_database("serialization")
+    seed_database(sync_url, 1, args.workouts, args.exercises)
+    app = build_app(*await load_workouts(async_url))
+
+    results = {path: await measure(app, f"/{path}", args.requests) for path in ("validated", "orjson")}
+    results["cpu_speedup"] = round(results["validated"]["cpu_ms_per_request"]
+                                   / results["orjson"]["cpu_ms_per_request"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workouts", type=int, default=1000)
+    parser.add_argument("--exercises", type=int, default=3, help="упражнений на тренировку")
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Смешанная нагрузка чтение/запись на SQLite с профилями подключения "default" и "production".
+Каждый поток берёт своё соединение из пула и в цикле читает страницу тренировок
+или (с вероятностью --write-ratio) вставляет тренировку и делает commit.
+
+    python -m benchmarks.sqlite_profile --threads 16 --seconds 10
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.common import seed_database, temp_database
+from core.database import apply_sqlite_profile
+from models.workouts import Workout
+
+
+def run_profile(profile: str, args) -> dict:
+    sync_url, _ = temp_database(f"profile_{profile}")
+    seed_database(sync_url, args.users, args.workouts, 0)
+    engine = create_engine(sync_url, connect_args={"check_same_thread": False},
+                           pool_size=args.threads, max_overflow=0)
+    apply_sqlite_profile(engine, profile)
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed: int):
+        rnd = random.Random(seed)
+        local = {"reads": 0, "writes": 0, "locked": 0}
+        while time.perf_counter() < deadline:
+            user_id = rnd.randint(1, args.users)
+            try:
+                if rnd.random() < args.write_ratio:
+                    with engine.begin() as conn:
+                        conn.execute(insert(Workout).values(
+                            name="bench", duration_minutes=30, workout_type="cardio", user_id=user_id))
+                    local["writes"] += 1
+                else:
+                    with engine.connect() as conn:
+                        conn.execute(select(Workout).where(Workout.user_id == user_id)
+                                     .order_by(Workout.created_at.desc()).limit(50)).all()
+                    local["reads"] += 1
+            except OperationalError:
+                # "database is locked": писатель не дождался блокировки
+                local["locked"] += 1
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        **counts,
+        "reads_per_sec": round(counts["reads"] / args.seconds, 1),
+        "writes_per_sec": round(counts["writes"] / args.seconds, 1),
+    }
+
+
+def main(args):
+    results = {profile: run_profile(profile, args) for profile in ("default", "production")}
+    results["ops_speedup"] = round(
+        (results["production"]["reads"] + results["production"]["writes"])
+        / max(results["default"]["reads"] + results["default"]["writes"], 1), 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workouts", type=int, default=50, help="тренировок на пользователя")
+    main(parser.parse_args())
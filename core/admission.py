@@ -0,0 +1,143 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from .config import ADMISSION_EXEMPT_PATHS, ADMISSION_RULES
+
+
+class AdmissionLimiter:
+    """
+    Ограничивает число одновременно выполняемых запросов и длину очереди ожидающих.
+    Запрос, который по оценке (позиция в очереди × среднее время обработки / лимит) не дождётся слота
+    за max_wait секунд, отклоняется сразу, а не после того, как клиент уже ушёл по таймауту.
+    Все методы вызываются из одного цикла событий.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # Скользящее среднее времени обработки допущенного запроса
+        self.avg_service_seconds = 0.0
+        self._waiters = deque()
+
+    def estimated_wait(self, position: int) -> float:
+        return position * self.avg_service_seconds / self.max_concurrent
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait(len(self._waiters) + 1)))
+
+    async def acquire(self) -> bool:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        position = len(self._waiters) + 1
+        if position > self.max_queue or self.estimated_wait(position) > self.max_wait:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Слот передаёт release(), active при этом не меняется
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # Слот успели передать, но запрос уже не ждёт — отдаём слот следующему
+                self._pass_slot()
+            elif waiter in self._waiters:
+                # Отменённого ожидающего мог уже снять из очереди release(), выполнившийся до нашего возобновления
+                self._waiters.remove(waiter)
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            self.timed_out += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def release(self, service_seconds: float):
+        self.avg_service_seconds += 0.2 * (service_seconds - self.avg_service_seconds)
+        self._pass_slot()
+
+    def _pass_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_service_ms": round(self.avg_service_seconds * 1000, 2),
+        }
+
+
+def build_limiters(rules) -> list[tuple[str, AdmissionLimiter]]:
+    return [(prefix, AdmissionLimiter(prefix, *limits)) for prefix, *limits in rules]
+
+
+admission_limiters = build_limiters(ADMISSION_RULES)
+
+
+def admission_stats() -> dict:
+    return {prefix: limiter.stats() for prefix, limiter in admission_limiters}
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI-middleware допуска: слот занимается на всё время ответа, включая потоковую отдачу тела.
+    Не допущенный запрос получает 503 с Retry-After, не дойдя до обработчика и базы.
+    """
+
+    def __init__(self, app, limiters: list[tuple[str, AdmissionLimiter]] | None = None,
+                 exempt_paths=ADMISSION_EXEMPT_PATHS):
+        self.app = app
+        self.limiters = admission_limiters if limiters is None else limiters
+        self.exempt_paths = exempt_paths
+
+    def limiter_for(self, path: str) -> AdmissionLimiter | None:
+        if path in self.exempt_paths:
+            return None
+        for prefix, limiter in self.limiters:
+            if prefix == "/" or path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return limiter
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse({"detail": "Server is overloaded, retry later"},
+                                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    headers={"Retry-After": str(limiter.retry_after())})
+            await response(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started_at)
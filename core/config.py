@@ -1,5 +1,67 @@
 SQLALCHEMY_DATABASE_URL = "sqlite:///./fitness.db"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./fitness.db"
+# Чтение в GET-запросах: тот же файл в режиме только для чтения (или URL реплики); None — читать через основной движок
+SQLALCHEMY_READ_DATABASE_URL = "sqlite+aiosqlite:///file:./fitness.db?mode=ro&uri=true"
 ACCESS_TOKEN_EXPIRE_MINUTES = 5
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+SQLALCHEMY_TEST_READ_DATABASE_URL = "sqlite+aiosqlite:///file:./test.db?mode=ro&uri=true"
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 200
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_EPOCH_CACHE_SIZE = 10000
+TOKEN_EPOCH_CACHE_TTL_SECONDS = 30
+# Профиль подключения к SQLite: "production" (WAL, synchronous=NORMAL и др.) или "default" без настроек
+SQLITE_PROFILE = "production"
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_CACHE_SIZE_KIB = 64 * 1024
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+DB_READ_POOL_SIZE = 10
+DB_READ_MAX_OVERFLOW = 10
+BULK_MAX_ITEMS = 5000
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+# Удаление пользователя: до стольких тренировок — одной транзакцией, больше — фоновой очисткой пачками
+USER_DELETE_SYNC_MAX_WORKOUTS = 5000
+USER_PURGE_CHUNK_SIZE = 1000
+# Пауза между пачками очистки: другие запросы успевают взять блокировку записи SQLite
+USER_PURGE_PAUSE_SECONDS = 0.01
+# Строк на транзакцию при наполнении базы синтетическими данными (manage.py seed)
+SEED_BATCH_SIZE = 200_000
+# Сколько лучших по bm25 совпадений FTS5 проходит к фильтрам поиска упражнений; ограничивает время на частых словах
+SEARCH_MAX_CANDIDATES = 10000
+EXERCISE_CACHE_SIZE = 10000
+# Ограничивает устаревание записей, изменённых другими процессами (инвалидация действует только в своём)
+EXERCISE_CACHE_TTL_SECONDS = 300
+# Хэширование паролей: стоимость bcrypt (2^rounds итераций) и отдельный ограниченный пул потоков для него
+PASSWORD_BCRYPT_ROUNDS = 12
+PASSWORD_HASH_WORKERS = 2
+# Сколько хэширований может ждать в очереди пула; сверх этого вход и регистрация получают 503
+PASSWORD_HASH_MAX_PENDING = 32
+# Допуск запросов: (префикс пути, одновременно выполняемых, мест в очереди, предельное ожидание в секундах).
+# Действует первое совпавшее правило; у каждого правила свой лимит
+ADMISSION_RULES = [
+    ("/auth/login", 2 * PASSWORD_HASH_WORKERS, 8, 1.0),
+    ("/auth/signup", PASSWORD_HASH_WORKERS, 4, 1.0),
+    ("/workouts/import", 2, 2, 5.0),
+    ("/workouts/export", 4, 4, 2.0),
+    ("/", 64, 256, 2.0),
+]
+# Пути вне допуска: метрики должны сниматься и тогда, когда сервер перегружен
+ADMISSION_EXEMPT_PATHS = ("/metrics",)
+# Продакшен-сервер (gunicorn.conf.py): число воркеров по умолчанию — по ядру на воркер (None — по числу доступных ядер)
+SERVE_BIND = "0.0.0.0:8000"
+SERVE_WORKERS = None
+SERVE_PRELOAD_APP = True
+# Воркер перезапускается после стольких запросов (плюс случайная добавка), чтобы рост памяти был ограничен
+SERVE_MAX_REQUESTS = 10000
+SERVE_MAX_REQUESTS_JITTER = 1000
+SERVE_TIMEOUT_SECONDS = 60
+SERVE_GRACEFUL_TIMEOUT_SECONDS = 30
@@ -1,21 +1,197 @@
+import time
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import create_engine
 
-from .config import SQLALCHEMY_DATABASE_URL
+from .config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_ASYNC_DATABASE_URL, SQLALCHEMY_READ_DATABASE_URL
+from .config import SQLITE_PROFILE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KIB
+from .config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW
+from .metrics import Gauge, pool_checkout_wait_seconds, record_statement
+
+SQLITE_PROFILES = {
+    "default": {},
+    # WAL: читатели не блокируются писателем; NORMAL: fsync только на checkpoint, а не на каждый commit
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": -SQLITE_CACHE_SIZE_KIB,  # отрицательное значение задаёт размер в KiB
+        "temp_store": "MEMORY",
+    },
+}
+
+# Режим журнала и синхронизация — свойства файла и пишущих соединений; соединению только для чтения их не менять
+READ_ONLY_EXCLUDED_PRAGMAS = ("journal_mode", "synchronous")
+
+POOL_SETTINGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+
+READ_POOL_SETTINGS = {
+    "pool_size": DB_READ_POOL_SIZE,
+    "max_overflow": DB_READ_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+
+# Методы, которые не меняют данные: их запросы получают сессию чтения
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def apply_sqlite_profile(sync_engine, profile: str = SQLITE_PROFILE, read_only: bool = False):
+    """Выполняет PRAGMA профиля на каждом новом соединении движка."""
+    pragmas = SQLITE_PROFILES[profile]
+    if read_only:
+        pragmas = {name: value for name, value in pragmas.items() if name not in READ_ONLY_EXCLUDED_PRAGMAS}
+        pragmas["query_only"] = 1
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class TimedQueuePool(QueuePool):
+    """Пул, замеряющий ожидание свободного соединения; метка берётся из класса и переживает engine.dispose()."""
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_wait_seconds.observe(time.perf_counter() - started_at, self.metrics_name)
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+class TimedReadPool(TimedAsyncAdaptedQueuePool):
+    metrics_name = "read"
+
+
+class RoutingSession(Session):
+    """
+    Сессия запроса на чтение: SELECT идут через read_bind (read-only движок или реплику), пока сессия
+    ничего не записала. Первый flush или DML-запрос переключает её на пишущий движок до конца жизни сессии,
+    так что запрос видит собственные изменения. DML в виде text() не распознаётся — такие записи
+    выполняются через сессию записи.
+    """
+
+    def __init__(self, *args, read_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_bind = read_bind
+        self.uses_writer = read_bind is None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.uses_writer:
+            if not self._flushing and not getattr(clause, "is_dml", False):
+                return self.read_bind
+            self.uses_writer = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
 
+instrumented_engines = {}
+
+
+def instrument_engine(sync_engine, name: str):
+    """Считает число и время SQL-запросов движка, в том числе в разрезе текущего HTTP-запроса."""
+    instrumented_engines[name] = sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info["statement_started_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        record_statement(name, time.perf_counter() - conn.info.pop("statement_started_at"))
+
+
+def _pool_stats(method: str):
+    def collect():
+        return {(name, ): getattr(sync_engine.pool, method)() for name, sync_engine in instrumented_engines.items()
+                if hasattr(sync_engine.pool, method)}
+    return collect
+
+
+Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ("engine",),
+      collect=_pool_stats("checkedout"))
+Gauge("db_pool_size", "Configured pool size", ("engine",), collect=_pool_stats("size"))
+Gauge("db_pool_overflow", "Overflow connections currently open", ("engine",), collect=_pool_stats("overflow"))
+
+# Синхронный движок: миграции, скрипты и бенчмарки
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=TimedQueuePool, **POOL_SETTINGS
+)
+apply_sqlite_profile(engine)
+instrument_engine(engine, "sync")
+
+# Асинхронный движок (aiosqlite): обработчики не держат слот threadpool, пока ждут SQLite
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool,
+                                   **POOL_SETTINGS)
+apply_sqlite_profile(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def read_session_factory(write_engine, read_engine):
+    """Фабрика сессий чтения: RoutingSession, читающая через read_engine; без read_engine — обычные сессии записи."""
+    return async_sessionmaker(
+        bind=write_engine, class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False,
+        expire_on_commit=False, read_bind=read_engine.sync_engine if read_engine is not None else None
+    )
+
+
+# Движок чтения со своим пулом: SQLite в режиме mode=ro (или реплика); читатели не занимают пул записи
+read_engine = None
+if SQLALCHEMY_READ_DATABASE_URL:
+    read_engine = create_async_engine(SQLALCHEMY_READ_DATABASE_URL, poolclass=TimedReadPool, **READ_POOL_SETTINGS)
+    apply_sqlite_profile(read_engine.sync_engine, read_only=True)
+    instrument_engine(read_engine.sync_engine, "read")
+AsyncReadSessionLocal = read_session_factory(async_engine, read_engine)
 
 Base = declarative_base()
 
 
-# Зависимость для получения сессии БД
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def dispose_engines_after_fork():
+    """
+    Вызывается в дочернем процессе после fork (gunicorn post_fork): пулы всех движков начинаются с нуля,
+    и воркеры не делят соединения SQLite, открытые в мастере. close=False — эти соединения принадлежат
+    мастеру, закрывать их из дочернего процесса нельзя.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.sync_engine.dispose(close=False)
+
+
+def session_router(write_factory, read_factory):
+    """
+    Зависимости get_db и get_session_factory, выбирающие фабрику по методу запроса: GET/HEAD/OPTIONS читают
+    через сессию чтения, остальные методы целиком работают с пишущим движком.
+    """
+    def factory_for(request: Request):
+        return read_factory if request.method in SAFE_METHODS else write_factory
+
+    async def get_db(request: Request):
+        async with factory_for(request)() as db:
+            yield db
+
+    return get_db, factory_for
+
+
+# Зависимость для получения сессии БД; get_session_factory — фабрика для кода, который работает дольше
+# обработчика (например, потоковые ответы): сессия из get_db закрывается до отправки тела StreamingResponse
+get_db, get_session_factory = session_router(AsyncSessionLocal, AsyncReadSessionLocal)
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from .config import PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+
+class BcryptHasher:
+    scheme = "bcrypt"
+
+    def __init__(self, rounds: int = PASSWORD_BCRYPT_ROUNDS):
+        self.rounds = rounds
+
+    @staticmethod
+    def _encode(password: str) -> bytes:
+        # bcrypt учитывает только первые 72 байта; обрезаем явно, а не полагаемся на поведение версии библиотеки
+        return password.encode()[:72]
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def hash(self, password: str) -> str:
+        return bcrypt.hashpw(self._encode(password), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(self._encode(password), hashed.encode())
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # $2b$12$... — стоимость записана в самом хэше
+        return int(hashed.split("$")[2]) != self.rounds
+
+
+class LegacySha256Hasher:
+    """Несолёный SHA-256 прежних версий: только проверка, при успешном входе хэш заменяется."""
+    scheme = "sha256"
+
+    def identify(self, hashed: str) -> bool:
+        return len(hashed) == 64 and all(c in "0123456789abcdef" for c in hashed)
+
+    def hash(self, password: str) -> str:
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return hmac.compare_digest(self.hash(password), hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return True
+
+
+class PasswordContext:
+    """Новые хэши создаёт первый хэшер; проверка выбирает хэшер по формату сохранённого хэша."""
+
+    def __init__(self, *hashers):
+        self.hashers = list(hashers)
+
+    @property
+    def default(self):
+        return self.hashers[0]
+
+    def hash(self, password: str) -> str:
+        return self.default.hash(password)
+
+    def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """Возвращает (пароль верен, новый хэш или None, если пересчитывать не нужно)."""
+        hasher = next((h for h in self.hashers if h.identify(hashed)), None)
+        if hasher is None or not hasher.verify(password, hashed):
+            return False, None
+        if hasher is not self.default or hasher.needs_rehash(hashed):
+            return True, self.default.hash(password)
+        return True, None
+
+
+class HashingExecutor:
+    """
+    Отдельный пул потоков для хэширования: bcrypt отпускает GIL, но занимает ядро на сотни миллисекунд,
+    поэтому вход и регистрация не должны делить пул потоков с остальными запросами.
+    Очередь ограничена: при переполнении запрос сразу получает 503, а не ждёт бесконечно.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Потоки создаются при первом вызове, уже в рабочем процессе, а не до fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Too many concurrent password checks, retry later",
+                                    headers={"Retry-After": "1"})
+            self.pending += 1
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self.completed += 1
+                    self.wait_seconds += started_at - submitted_at
+                    self.max_wait_seconds = max(self.max_wait_seconds, started_at - submitted_at)
+                    self.run_seconds += finished_at - started_at
+
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(job))
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = max(self.completed, 1)
+            return {
+                "workers": self.max_workers,
+                "in_flight": self.pending,
+                "queue_depth": max(self.pending - self.max_workers, 0),
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / completed * 1000, 2),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+                "avg_hash_ms": round(self.run_seconds / completed * 1000, 2),
+            }
+
+
+password_context = PasswordContext(BcryptHasher(), LegacySha256Hasher())
+hashing_executor = HashingExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_password(password: str) -> str:
+    return await hashing_executor.run(password_context.hash, password)
+
+
+async def verify_and_update_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    return await hashing_executor.run(password_context.verify_and_update, password, hashed)
@@ -0,0 +1,176 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+Запись метрики — несколько арифметических операций под блокировкой, поэтому сбор можно держать включённым.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """Значения вычисляются при чтении /metrics функцией collect: {кортеж меток: значение}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self):
+        values = self.collect() if self.collect else {}
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        # Счётчики по корзинам хранятся без накопления; накопленные суммы считаются при чтении
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            entries = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in entries:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", _labels(self.labelnames, key, f'le="{bound}"'), cumulative))
+            samples.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+            samples.append((f"{self.name}_count", _labels(self.labelnames, key), count))
+        return samples
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status",
+                        ("method", "route", "status"))
+http_request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency, including body streaming",
+                                 ("method", "route"))
+request_sql_statements = Histogram("http_request_sql_statements", "SQL statements executed per HTTP request",
+                                   ("route",), buckets=COUNT_BUCKETS)
+request_sql_seconds = Histogram("http_request_sql_seconds", "Time spent in SQL per HTTP request",
+                                ("route",), buckets=SQL_BUCKETS)
+sql_statements = Counter("db_statements_total", "SQL statements executed", ("engine",))
+sql_statement_seconds = Histogram("db_statement_duration_seconds", "SQL statement execution time",
+                                  ("engine",), buckets=SQL_BUCKETS)
+pool_checkout_wait_seconds = Histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+                                       ("engine",), buckets=SQL_BUCKETS)
+auth_seconds = Histogram("auth_get_current_user_seconds", "Time spent in get_current_user", buckets=SQL_BUCKETS)
+
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+# Счётчики SQL текущего HTTP-запроса; события движка пишут сюда, middleware публикует по завершении
+current_request = ContextVar("current_request", default=None)
+
+
+def record_statement(engine_name: str, seconds: float):
+    sql_statements.inc(engine_name)
+    sql_statement_seconds.observe(seconds, engine_name)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Латентность и статусы по шаблону маршрута (/workouts/{workout_id}), а не по сырому пути."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            current_request.reset(token)
+            # Маршрут известен только после роутинга; не найденные пути сводятся к одной метке
+            route = scope.get("route")
+            route_path = getattr(route, "path", "<unmatched>")
+            http_requests.inc(scope["method"], route_path, str(status_code))
+            http_request_seconds.observe(elapsed, scope["method"], route_path)
+            request_sql_statements.observe(stats.statements, route_path)
+            request_sql_seconds.observe(stats.sql_seconds, route_path)
@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_page(query, model, cursor: str | None, limit: int):
+    """
+    Страница по ключу (created_at, id) от новых к старым.
+    Условие строится по значению ключа, а не по OFFSET, поэтому страница N стоит столько же, сколько первая.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < (created_at, row_id))
+    # Одна лишняя строка говорит о наличии следующей страницы
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int):
+    """Отрезает служебную строку и возвращает (элементы страницы, курсор следующей страницы)."""
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    return items, encode_cursor(items[-1].created_at, items[-1].id)
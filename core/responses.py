@@ -0,0 +1,9 @@
+from fastapi.responses import ORJSONResponse
+
+
+def json_response(content, status_code: int = 200, headers: dict | None = None) -> ORJSONResponse:
+    """
+    Кодирует готовые словари (to_dict()) в JSON за один проход orjson. Обработчик, вернувший Response,
+    минует повторную валидацию по response_model и jsonable_encoder; response_model остаётся для OpenAPI.
+    """
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
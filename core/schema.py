@@ -0,0 +1,95 @@
+"""
+Версия схемы базы (Alembic) и построение индексов вне миграций.
+Схема создаётся и меняется только командой `python manage.py migrate`; при старте приложение лишь сверяет версию.
+Alembic импортируется только в командах: при старте он не нужен, а его импорт заметно удлиняет холодный старт.
+"""
+import logging
+import os
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from core.database import Base
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "alembic.ini"))
+
+# Ревизия схемы, под которую написан код; тест сверяет её с последней миграцией в migrations/versions
+SCHEMA_REVISION = "0004"
+
+# Таблицы, которых нет в моделях: версия Alembic и служебные таблицы FTS5 (exercises_fts, exercises_fts_data, ...)
+UNMANAGED_TABLES = ("alembic_version", "exercises_fts", "sqlite_")
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Фильтр сравнения схемы с моделями: служебные таблицы не считаются лишними."""
+    return not (type_ == "table" and name.startswith(UNMANAGED_TABLES))
+
+
+def alembic_config(url: str | None = None):
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    if url:
+        config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def schema_revision(connection) -> str | None:
+    try:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except OperationalError:
+        # Таблицы нет: база пустая или создана прежним create_all
+        return None
+
+
+def check_schema_version(engine) -> bool:
+    """Одно чтение alembic_version вместо отражения всех таблиц; при расхождении — предупреждение в лог."""
+    with engine.connect() as conn:
+        current = schema_revision(conn)
+    if current != SCHEMA_REVISION:
+        logger.warning("Database schema is at revision %s, expected %s: run `python manage.py migrate`",
+                       current, SCHEMA_REVISION)
+        return False
+    return True
+
+
+def missing_indexes(connection) -> list:
+    """Индексы моделей, которых нет в базе (для существующих таблиц)."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in sorted(table.indexes, key=lambda index: index.name)
+                       if index.name not in existing)
+    return missing
+
+
+def build_indexes(engine, on_progress=None) -> list[str]:
+    """
+    Строит недостающие индексы моделей по одному, каждый в своей транзакции: запись в таблицу ждёт
+    только построения текущего индекса, чтение в WAL не блокируется вовсе.
+    Миграции создают индексы с if_not_exists, поэтому построенный заранее индекс они пропускают.
+    """
+    with engine.connect() as conn:
+        indexes = missing_indexes(conn)
+    built = []
+    for index in indexes:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            index.create(conn, checkfirst=True)
+        built.append(index.name)
+        if on_progress:
+            on_progress(index.name, time.perf_counter() - started)
+    return built
@@ -1,25 +1,44 @@
-import hashlib
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Annotated
+from typing import Annotated, NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError, ExpiredSignatureError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.users import User
+from .cache import LRUCache
 from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .hashing import password_context
+from .metrics import auth_seconds
+from .config import TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS, TOKEN_EPOCH_CACHE_SIZE, TOKEN_EPOCH_CACHE_TTL_SECONDS
 from .database import get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+class AuthenticatedUser(NamedTuple):
+    id: int
+    email: str
+    token_epoch: int
+
+
+# Уже проверенные токены: подпись и срок не проверяются повторно на каждый запрос
+token_cache = LRUCache(TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# user_id -> token_epoch. TTL ограничивает устаревание между воркерами, внутри процесса
+# запись сбрасывается сразу после записи в users
+token_epochs = LRUCache(TOKEN_EPOCH_CACHE_SIZE, ttl=TOKEN_EPOCH_CACHE_TTL_SECONDS)
+
+
 def get_password_hash(password: str):
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Синхронный вариант для скриптов; обработчики запросов используют core.hashing.hash_password."""
+    return password_context.hash(password)
 
 
 def verify_password(plain_password, hashed_password):
-    return get_password_hash(plain_password) == hashed_password
+    return password_context.verify_and_update(plain_password, hashed_password)[0]
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -30,41 +49,98 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
-def create_user_header(email: str) -> str:
+def create_user_header(user) -> str:
     access_token = create_access_token(
-        data={"sub": email},
+        data={"sub": user.email, "uid": user.id, "epoch": user.token_epoch},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return f"Bearer {access_token}"
 
 
-def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+def revoke_user_tokens(user: User):
+    """Помечает все выданные пользователю токены как отозванные; вступает в силу после commit."""
+    user.token_epoch = User.token_epoch + 1
+
+
+def forget_token_epoch(user_id: int):
+    """Сбрасывает закэшированную эпоху пользователя; вызывается после commit изменений в users."""
+    token_epochs.pop(user_id)
+
+
+def clear_auth_caches():
+    token_cache.clear()
+    token_epochs.clear()
+
+
+async def get_token_epoch(db: AsyncSession, user_id: int) -> int | None:
+    epoch = token_epochs.get(user_id)
+    if epoch is None:
+        result = await db.execute(select(User.token_epoch).where(User.id == user_id))
+        epoch = result.scalar()
+        if epoch is not None:
+            token_epochs.set(user_id, epoch)
+    return epoch
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_db)):
+    started_at = time.perf_counter()
+    try:
+        return await authenticate(token, db)
+    finally:
+        auth_seconds.observe(time.perf_counter() - started_at)
+
+
+async def authenticate(token: str, db: AsyncSession) -> AuthenticatedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    revoked_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-    try:
-        if token.startswith("Bearer "):
-            token = token[len("Bearer "):].strip()
-
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    if token.startswith("Bearer "):
+        token = token[len("Bearer "):].strip()
+
+    principal = token_cache.get(token)
+    if principal is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has expired",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        except JWTError:
             raise credentials_exception
 
-    except ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+        if payload.get("uid") is None or payload.get("epoch") is None:
+            # Токены старого формата содержат только email: id ищется в БД один раз, дальше токен берётся
+            # из кэша, как новый. Они выданы до появления эпох и считаются выданными в эпоху 0 — первое же
+            # изменение пользователя (token_epoch > 0) отзывает их так же, как новые токены
+            user_id = (await db.execute(select(User.id).where(User.email == email))).scalar()
+            if user_id is None:
+                raise credentials_exception
+            principal = AuthenticatedUser(user_id, email, payload.get("epoch", 0))
+        else:
+            principal = AuthenticatedUser(payload["uid"], email, payload["epoch"])
+        # Запись в кэше не должна пережить сам токен; токен без exp не истекает и живёт в кэше обычный срок
+        expires_at = payload.get("exp")
+        ttl = TOKEN_CACHE_TTL_SECONDS if expires_at is None else min(TOKEN_CACHE_TTL_SECONDS, expires_at - time.time())
+        token_cache.set(token, principal, ttl=ttl)
+
+    current_epoch = await get_token_epoch(db, principal.id)
+    if current_epoch is None:
         raise credentials_exception
+    if current_epoch != principal.token_epoch:
+        raise revoked_exception
 
-    return user
+    return principal
@@ -0,0 +1,50 @@
+"""
+Конфигурация продакшен-сервера: gunicorn с воркерами uvicorn.
+
+    python manage.py serve
+    gunicorn -c gunicorn.conf.py main:app
+
+Переменные окружения WEB_CONCURRENCY и BIND переопределяют число воркеров и адрес.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.config import (SERVE_BIND, SERVE_GRACEFUL_TIMEOUT_SECONDS, SERVE_MAX_REQUESTS,
+                         SERVE_MAX_REQUESTS_JITTER, SERVE_PRELOAD_APP, SERVE_TIMEOUT_SECONDS, SERVE_WORKERS)
+
+
+def available_cores() -> int:
+    # sched_getaffinity учитывает ограничение CPU процесса (taskset, cgroup cpuset), cpu_count — нет
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+try:
+    import uvicorn_worker  # noqa: F401
+
+    worker_class = "uvicorn_worker.UvicornWorker"
+except ImportError:
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get("BIND", SERVE_BIND)
+# Асинхронный воркер сам держит много одновременных запросов, поэтому воркеров — по одному на ядро
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or SERVE_WORKERS or available_cores()
+# Приложение импортируется в мастере до fork: код и неизменяемые данные делятся между воркерами copy-on-write
+preload_app = SERVE_PRELOAD_APP
+max_requests = SERVE_MAX_REQUESTS
+# Случайная добавка к max_requests, чтобы воркеры не перезапускались одновременно
+max_requests_jitter = SERVE_MAX_REQUESTS_JITTER
+timeout = SERVE_TIMEOUT_SECONDS
+graceful_timeout = SERVE_GRACEFUL_TIMEOUT_SECONDS
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    from core.database import dispose_engines_after_fork
+
+    dispose_engines_after_fork()
@@ -1,20 +1,31 @@
 from fastapi import FastAPI
 
+from core.admission import AdmissionControlMiddleware
+from core.metrics import MetricsMiddleware
 from routes.auth import router as auth_router
+from routes.exercises import router as exercises_router
+from routes.metrics import router as metrics_router
 from routes.users import router as users_router
 from routes.workouts import router as workouts_router
 
 app = FastAPI()
+app.add_middleware(AdmissionControlMiddleware)
+# Добавленное последним выполняется первым: отклонённые допуском запросы тоже попадают в метрики
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(users_router)
 app.include_router(workouts_router)
+app.include_router(exercises_router)
 app.include_router(auth_router)
+app.include_router(metrics_router)
 
 
 @app.on_event("startup")
 def startup_event():
-    from core.database import Base, engine
-    Base.metadata.create_all(bind=engine)
+    # Схему создаёт и обновляет `python manage.py migrate`; здесь только сверка версии одним запросом
+    from core.database import engine
+    from core.schema import check_schema_version
+    check_schema_version(engine)
 
 
 @app.get("/")
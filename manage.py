@@ -0,0 +1,209 @@
+"""
+Служебные команды Fitness Planner.
+
+    python manage.py migrate
+    python manage.py serve --workers 4
+    python manage.py build-indexes
+    python manage.py import-workouts --email user@example.com --format ndjson workouts.ndjson
+    python manage.py user-stats verify
+    python manage.py purge-users --email user@example.com
+    python manage.py search-index
+    python manage.py seed --users 100000 --exercises 200000 --workouts-per-user geometric:50 --defer-indexes
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from alembic import command
+from sqlalchemy import select
+
+from core.config import SEED_BATCH_SIZE, USER_PURGE_CHUNK_SIZE
+from core.database import AsyncSessionLocal, async_engine, engine
+from core.schema import alembic_config, build_indexes
+from models.users import User
+from schemas.workouts import ExportFormat
+from services.importer import import_workouts
+from services.search import rebuild_search_index
+from services.seed import seed_database
+from services.user_stats import rebuild_user_stats, verify_user_stats
+from services.users import delete_user_row, orphaned_workout_owners, purge_workouts
+
+CHUNK_SIZE = 64 * 1024
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def read_chunks(path: str):
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        while chunk := stream.read(CHUNK_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def import_workouts_command(args):
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(select(User.id).where(User.email == args.email))).scalar()
+        if user_id is None:
+            sys.exit(f"User {args.email} not found")
+
+        def print_progress(report):
+            print(f"imported {report['imported']}, failed {report['failed']}", file=sys.stderr)
+
+        report = await import_workouts(db, user_id, read_chunks(args.path), ExportFormat(args.format),
+                                       on_progress=print_progress)
+    await async_engine.dispose()
+
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['errors']}", file=sys.stderr)
+    print(f"processed {report['processed']}, imported {report['imported']}, failed {report['failed']}")
+
+
+async def user_stats_command(args):
+    async with AsyncSessionLocal() as db:
+        drift = await verify_user_stats(db)
+        for entry in drift:
+            print(f"user {entry['user_id']}: {entry['differences']}")
+        print(f"{len(drift)} users with drift")
+        if args.action == "rebuild":
+            await rebuild_user_stats(db)
+            print("user_stats rebuilt")
+    await async_engine.dispose()
+    if args.action == "verify" and drift:
+        sys.exit(1)
+
+
+async def search_index_command(args):
+    async with AsyncSessionLocal() as db:
+        await rebuild_search_index(db)
+    await async_engine.dispose()
+    print("exercises_fts rebuilt")
+
+
+async def purge_users_command(args):
+    async with AsyncSessionLocal() as db:
+        if args.email:
+            user_id = (await db.execute(select(User.id).where(User.email == args.email))).scalar()
+            if user_id is None:
+                sys.exit(f"User {args.email} not found")
+            await delete_user_row(db, user_id)
+            await db.commit()
+            user_ids = [user_id]
+        else:
+            # Без --email продолжаются прерванные очистки: тренировки, владельцев которых уже нет
+            user_ids = await orphaned_workout_owners(db)
+
+    for user_id in user_ids:
+        def print_progress(deleted, total):
+            print(f"user {user_id}: purged {deleted} of {total} workouts", file=sys.stderr)
+
+        await purge_workouts(AsyncSessionLocal, user_id, chunk_size=args.chunk_size, on_progress=print_progress)
+    await async_engine.dispose()
+    print(f"{len(user_ids)} users purged")
+
+
+async def serve_command(args):
+    # Процесс заменяется gunicorn: мастер не должен наследовать соединения и пулы, открытые этой командой
+    argv = [sys.executable, "-m", "gunicorn", "--config", os.path.join(PROJECT_DIR, "gunicorn.conf.py")]
+    if args.bind:
+        argv += ["--bind", args.bind]
+    if args.workers:
+        argv += ["--workers", str(args.workers)]
+    if args.max_requests is not None:
+        argv += ["--max-requests", str(args.max_requests)]
+    os.chdir(PROJECT_DIR)
+    os.execv(sys.executable, argv + ["main:app"])
+
+
+async def migrate_command(args):
+    command.upgrade(alembic_config(), args.revision, sql=args.sql)
+
+
+async def build_indexes_command(args):
+    def print_progress(name, seconds):
+        print(f"{name} built in {seconds:.1f}s", file=sys.stderr)
+
+    built = build_indexes(engine, on_progress=print_progress)
+    engine.dispose()
+    print(f"{len(built)} indexes built")
+
+
+async def seed_command(args):
+    def print_progress(counts):
+        print(", ".join(f"{table} {count}" for table, count in counts.items()), file=sys.stderr)
+
+    # Распределения разбираются до первой записи: ошибка в них ничего не меняет в базе
+    try:
+        report = seed_database(engine, args.users, args.exercises, workouts_per_user=args.workouts_per_user,
+                               exercises_per_workout=args.exercises_per_workout, workout_types=args.workout_types,
+                               exercise_types=args.exercise_types, seed=args.seed, batch_size=args.batch_size,
+                               defer_indexes=args.defer_indexes, on_progress=print_progress)
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        engine.dispose()
+    print(", ".join(f"{key} {value}" for key, value in report.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="запустить gunicorn с воркерами uvicorn (gunicorn.conf.py)")
+    serve_parser.add_argument("--bind", help="адрес, по умолчанию SERVE_BIND или $BIND")
+    serve_parser.add_argument("--workers", type=int, help="по умолчанию по одному на доступное ядро")
+    serve_parser.add_argument("--max-requests", type=int, help="перезапуск воркера после стольких запросов, 0 — никогда")
+    serve_parser.set_defaults(handler=serve_command)
+
+    migrate_parser = commands.add_parser("migrate", help="обновить схему базы до последней миграции")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    migrate_parser.add_argument("--sql", action="store_true", help="напечатать SQL миграций, не применяя его")
+    migrate_parser.set_defaults(handler=migrate_command)
+
+    indexes_parser = commands.add_parser("build-indexes",
+                                         help="построить индексы моделей, которых нет в базе, по одному")
+    indexes_parser.set_defaults(handler=build_indexes_command)
+
+    import_parser = commands.add_parser("import-workouts", help="импорт тренировок из NDJSON или CSV")
+    import_parser.add_argument("--email", required=True, help="владелец импортируемых тренировок")
+    import_parser.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.ndjson.value)
+    import_parser.add_argument("path", help="путь к файлу или - для stdin")
+    import_parser.set_defaults(handler=import_workouts_command)
+
+    stats_parser = commands.add_parser("user-stats", help="проверка и пересборка сводки user_stats")
+    stats_parser.add_argument("action", choices=["verify", "rebuild"],
+                              help="verify — сообщить о расхождениях, rebuild — пересчитать с нуля")
+    stats_parser.set_defaults(handler=user_stats_command)
+
+    purge_parser = commands.add_parser("purge-users",
+                                       help="удалить тренировки удалённых пользователей пачками, не блокируя запись")
+    purge_parser.add_argument("--email", help="сначала удалить этого пользователя")
+    purge_parser.add_argument("--chunk-size", type=int, default=USER_PURGE_CHUNK_SIZE, help="тренировок на транзакцию")
+    purge_parser.set_defaults(handler=purge_users_command)
+
+    search_parser = commands.add_parser("search-index", help="создать и перестроить полнотекстовый индекс упражнений")
+    search_parser.set_defaults(handler=search_index_command)
+
+    seed_parser = commands.add_parser("seed", help="наполнить базу синтетическими данными")
+    seed_parser.add_argument("--users", type=int, default=1000)
+    seed_parser.add_argument("--exercises", type=int, default=1000)
+    seed_parser.add_argument("--workouts-per-user", default="geometric:20",
+                             help="fixed:N, uniform:A-B или geometric:MEAN")
+    seed_parser.add_argument("--exercises-per-workout", default="uniform:2-6",
+                             help="fixed:N, uniform:A-B или geometric:MEAN")
+    seed_parser.add_argument("--workout-types", help="доли типов тренировок, например strength=5,cardio=3,flexibility=2")
+    seed_parser.add_argument("--exercise-types", help="доли типов упражнений, например cardio=1,strength=2")
+    seed_parser.add_argument("--seed", type=int, default=0, help="один и тот же seed даёт одну и ту же базу")
+    seed_parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="строк на транзакцию")
+    seed_parser.add_argument("--defer-indexes", action="store_true",
+                             help="снять вторичные индексы на время загрузки и построить их в конце")
+    seed_parser.set_defaults(handler=seed_command)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Окружение Alembic. URL базы — sqlalchemy.url из конфигурации, если задан, иначе SQLALCHEMY_DATABASE_URL.
+Для SQLite изменения таблиц выполняются в batch-режиме (копирование таблицы), так как ALTER в SQLite ограничен.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from core.config import SQLALCHEMY_DATABASE_URL
+from core.database import Base
+from core.schema import include_name
+import models.associations  # noqa: F401  регистрирует таблицы в Base.metadata
+import models.exercises  # noqa: F401
+import models.user_stats  # noqa: F401
+import models.users  # noqa: F401
+import models.workouts  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+url = config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
+
+def run_migrations_offline():
+    """--sql: печатает SQL миграций, не подключаясь к базе."""
+    context.configure(url=url, target_metadata=Base.metadata, include_name=include_name,
+                      literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=Base.metadata, include_name=include_name,
+                          render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
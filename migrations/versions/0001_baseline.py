@@ -0,0 +1,154 @@
+"""Baseline: users, exercises, workouts, workout_exercises, user_stats and exercises_fts
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+Все операции с if_not_exists: в базе, созданной прежним create_all при старте, существующие таблицы
+не меняются, создаются только недостающие таблицы и индексы. Недостающие колонки добавляет ревизия 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXERCISE_TYPES = ("cardio", "strength", "flexibility")
+WORKOUT_TYPES = ("strength", "cardio", "flexibility")
+
+EXERCISE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5(
+        name, description,
+        content='exercises', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_insert AFTER INSERT ON exercises BEGIN
+        INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_delete AFTER DELETE ON exercises BEGIN
+        INSERT INTO exercises_fts(exercises_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_update AFTER UPDATE OF name, description ON exercises BEGIN
+        INSERT INTO exercises_fts(exercises_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("password_hash", sa.String(length=100), nullable=False),
+        sa.Column("experience_level", sa.Enum("beginner", "intermediate", "advanced"), nullable=False),
+        sa.Column("goal", sa.Enum("weight_loss", "muscle_gain", "endurance"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("token_epoch", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"], if_not_exists=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True, if_not_exists=True)
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "exercises",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("description", sa.String(length=500), nullable=True),
+        sa.Column("calories_per_minute", sa.Integer(), nullable=False),
+        sa.Column("exercise_type", sa.Enum(*EXERCISE_TYPES), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_exercises_id", "exercises", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "workouts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("description", sa.String(length=500), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False),
+        sa.Column("workout_type", sa.Enum(*WORKOUT_TYPES), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_workouts_id", "workouts", ["id"], if_not_exists=True)
+    op.create_index("ix_workouts_user_id_created_at_id", "workouts", ["user_id", "created_at", "id"],
+                    if_not_exists=True)
+
+    op.create_table(
+        "workout_exercises",
+        sa.Column("workout_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"]),
+        sa.ForeignKeyConstraint(["workout_id"], ["workouts.id"]),
+        sa.PrimaryKeyConstraint("workout_id", "exercise_id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_workout_exercises_exercise_id_workout_id", "workout_exercises",
+                    ["exercise_id", "workout_id"], if_not_exists=True)
+
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("total_workouts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total_minutes", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total_calories", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("strength_workouts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("cardio_workouts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("flexibility_workouts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_workout_at", sa.DateTime(), nullable=True),
+        sa.Column("workouts_version", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+        if_not_exists=True,
+    )
+
+    for statement in EXERCISE_FTS:
+        op.execute(statement)
+    # Для базы, где упражнения появились раньше полнотекстового индекса; на новой базе — пустая операция
+    op.execute("INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS exercises_fts")
+    op.drop_table("user_stats")
+    op.drop_index("ix_workout_exercises_exercise_id_workout_id", table_name="workout_exercises")
+    op.drop_table("workout_exercises")
+    op.drop_index("ix_workouts_user_id_created_at_id", table_name="workouts")
+    op.drop_index("ix_workouts_id", table_name="workouts")
+    op.drop_table("workouts")
+    op.drop_index("ix_exercises_id", table_name="exercises")
+    op.drop_table("exercises")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_table("users")
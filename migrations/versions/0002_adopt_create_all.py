@@ -0,0 +1,83 @@
+"""Adopt databases created by the former startup create_all
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 20:00:00
+
+0001 создаёт таблицы с if_not_exists и существующие таблицы не меняет. База, созданная прежним create_all
+(исходной схемой или любой промежуточной), остаётся без колонок, добавленных позже, а users — без AUTOINCREMENT.
+Ревизия добавляет недостающие колонки, пересоздаёт users с AUTOINCREMENT и заполняет user_stats для
+пользователей с тренировками, но без сводки. На базе, созданной миграциями, ничего не меняет.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def added_columns() -> dict[str, list[sa.Column]]:
+    """Колонки, появившиеся в моделях после исходной схемы (новые объекты при каждом вызове)."""
+    return {
+        "users": [sa.Column("token_epoch", sa.Integer(), server_default="0", nullable=False)],
+        "workouts": [
+            sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        ],
+        "user_stats": [sa.Column("workouts_version", sa.Integer(), server_default="0", nullable=False)],
+    }
+
+
+# Сводка для пользователей, у которых есть тренировки, но нет строки в user_stats (тот же пересчёт,
+# что recomputed_stats_query); у остальных сводка уже ведётся и не трогается
+BACKFILL_USER_STATS = """
+    INSERT INTO user_stats (user_id, total_workouts, total_minutes, total_calories, strength_workouts,
+                            cardio_workouts, flexibility_workouts, last_workout_at, workouts_version)
+    SELECT w.user_id, count(*), sum(w.duration_minutes),
+           sum(w.duration_minutes * (SELECT coalesce(sum(e.calories_per_minute), 0)
+                                     FROM workout_exercises AS we JOIN exercises AS e ON e.id = we.exercise_id
+                                     WHERE we.workout_id = w.id)),
+           sum(w.workout_type = 'strength'), sum(w.workout_type = 'cardio'), sum(w.workout_type = 'flexibility'),
+           max(w.created_at), 1
+    FROM workouts AS w
+    WHERE w.user_id IN (SELECT id FROM users) AND w.user_id NOT IN (SELECT user_id FROM user_stats)
+    GROUP BY w.user_id
+"""
+
+
+def adopt_columns(connection):
+    inspector = sa.inspect(connection)
+    for table, columns in added_columns().items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        missing = [column for column in columns if column.name not in existing]
+        if missing:
+            with op.batch_alter_table(table) as batch:
+                for column in missing:
+                    batch.add_column(column)
+
+    users_sql = connection.execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'users'"))
+    if "AUTOINCREMENT" not in users_sql.scalar().upper():
+        # AUTOINCREMENT задаётся только при создании таблицы: users копируется, индексы пересоздаются.
+        # id удалённых до миграции пользователей SQLite уже не помнит; новые id идут после текущего максимума
+        with op.batch_alter_table("users", recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # В режиме --sql базы нет и сверять колонки не с чем; база из create_all обновляется только на подключении
+    if not context.is_offline_mode():
+        adopt_columns(op.get_bind())
+    op.execute(BACKFILL_USER_STATS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Колонки и AUTOINCREMENT совпадают с 0001, откатывать нечего
+    pass
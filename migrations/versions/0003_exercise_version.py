@@ -0,0 +1,35 @@
+"""Add exercises.version
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 21:00:00
+
+Версия упражнения входит в ключ кэша сериализованных упражнений: изменение упражнения в одном воркере
+не оставляет устаревших записей в кэшах других.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # База, созданная create_all по текущим моделям (тесты, seed), уже содержит колонку
+    if context.is_offline_mode() or "version" not in {
+            column["name"] for column in sa.inspect(op.get_bind()).get_columns("exercises")}:
+        with op.batch_alter_table("exercises") as batch:
+            batch.add_column(sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("exercises") as batch:
+        batch.drop_column("version")
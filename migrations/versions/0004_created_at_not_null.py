@@ -0,0 +1,49 @@
+"""Make users.created_at and workouts.created_at NOT NULL
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:00:00
+
+По (created_at, id) строится курсор постраничных списков: строку с NULL нельзя закодировать в курсор,
+а условие tuple_(created_at, id) < (...) её никогда не выбирает. Строки без created_at получают
+минимальную дату и остаются в конце списка, где SQLite и раньше сортировал NULL при DESC.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from core.database import Base
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MISSING_CREATED_AT = "1970-01-01 00:00:00.000000"
+
+# users пересоздаётся целиком: AUTOINCREMENT нужно задать заново, как в 0002
+TABLE_KWARGS = {"users": {"sqlite_autoincrement": True}, "workouts": {}}
+
+
+def batch_kwargs(table: str) -> dict:
+    # В режиме --sql таблицу не прочитать из базы: копия строится по моделям (env.py их импортирует)
+    copy_from = Base.metadata.tables[table] if context.is_offline_mode() else None
+    return {"table_kwargs": TABLE_KWARGS[table], "copy_from": copy_from}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLE_KWARGS:
+        op.execute(f"UPDATE {table} SET created_at = '{MISSING_CREATED_AT}' WHERE created_at IS NULL")
+        with op.batch_alter_table(table, **batch_kwargs(table)) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLE_KWARGS:
+        with op.batch_alter_table(table, **batch_kwargs(table)) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
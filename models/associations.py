@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Table
+from sqlalchemy import Column, Integer, ForeignKey, Index, Table
 
 from core.database import Base
 
@@ -6,5 +6,7 @@ workout_exercises = Table(
     "workout_exercises",
     Base.metadata,
     Column("workout_id", Integer, ForeignKey("workouts.id"), primary_key=True),
-    Column("exercise_id", Integer, ForeignKey("exercises.id"), primary_key=True)
+    Column("exercise_id", Integer, ForeignKey("exercises.id"), primary_key=True),
+    # Первичный ключ начинается с workout_id; обратный поиск тренировок по упражнению идёт по этому индексу
+    Index("ix_workout_exercises_exercise_id_workout_id", "exercise_id", "workout_id")
 )
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Enum, DateTime
+from sqlalchemy import DDL, Column, Integer, String, Enum, DateTime, event
 from sqlalchemy.orm import relationship
 
 from core.database import Base
@@ -16,6 +16,8 @@ class Exercise(Base):
     calories_per_minute = Column(Integer, nullable=False)
     exercise_type = Column(Enum('cardio', 'strength', 'flexibility'), nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    # Растёт при каждом изменении упражнения; входит в ключ кэша сериализованных упражнений
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     workouts = relationship("Workout", secondary=workout_exercises, back_populates="exercises")
 
@@ -28,3 +30,38 @@ class Exercise(Base):
             "exercise_type": self.exercise_type,
             "created_at": self.created_at.isoformat() if self.created_at else "None"
         }
+
+
+# Полнотекстовый индекс по name/description (external content: текст хранится только в exercises).
+# Триггеры держат индекс в синхронизации при любых записях — ORM, Core и массовом импорте.
+EXERCISE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5(
+        name, description,
+        content='exercises', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_insert AFTER INSERT ON exercises BEGIN
+        INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_delete AFTER DELETE ON exercises BEGIN
+        INSERT INTO exercises_fts(exercises_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercises_fts_update AFTER UPDATE OF name, description ON exercises BEGIN
+        INSERT INTO exercises_fts(exercises_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+for statement in EXERCISE_FTS_DDL:
+    event.listen(Exercise.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Exercise.__table__, "before_drop", DDL("DROP TABLE IF EXISTS exercises_fts").execute_if(dialect="sqlite"))
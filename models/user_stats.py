@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+
+from core.database import Base
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_workouts = Column(Integer, nullable=False, default=0, server_default="0")
+    total_minutes = Column(Integer, nullable=False, default=0, server_default="0")
+    total_calories = Column(Integer, nullable=False, default=0, server_default="0")
+    strength_workouts = Column(Integer, nullable=False, default=0, server_default="0")
+    cardio_workouts = Column(Integer, nullable=False, default=0, server_default="0")
+    flexibility_workouts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_workout_at = Column(DateTime)
+    # Версия списка тренировок пользователя для ETag; растёт при каждой записи в его тренировки
+    workouts_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def to_dict(self):
+        return {
+            "total_workouts": self.total_workouts,
+            "total_minutes": self.total_minutes,
+            "total_calories": self.total_calories,
+            "by_type": {
+                "strength": self.strength_workouts,
+                "cardio": self.cardio_workouts,
+                "flexibility": self.flexibility_workouts,
+            },
+            "last_workout_at": self.last_workout_at.isoformat() if self.last_workout_at else None
+        }
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import Column, Integer, String, Enum, DateTime
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from core.database import Base
@@ -8,6 +8,11 @@ from core.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # id удалённого пользователя не должен достаться новому: на нём держатся выданные токены
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -15,6 +20,9 @@ class User(Base):
     password_hash = Column(String(100), nullable=False)
     experience_level = Column(Enum('beginner', 'intermediate', 'advanced'), nullable=False)
     goal = Column(Enum('weight_loss', 'muscle_gain', 'endurance'), nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.now)
+    # NOT NULL: по (created_at, id) строится курсор страниц
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    # Увеличивается при смене пароля, обновлении или удалении профиля и отзывает ранее выданные токены
+    token_epoch = Column(Integer, nullable=False, default=0, server_default="0")
 
     workouts = relationship("Workout", back_populates="user")
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from core.database import Base
@@ -9,6 +9,10 @@ from models.associations import workout_exercises
 
 class Workout(Base):
     __tablename__ = "workouts"
+    __table_args__ = (
+        # Покрывает постраничный список тренировок пользователя по (created_at, id)
+        Index("ix_workouts_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -16,12 +20,22 @@ class Workout(Base):
     duration_minutes = Column(Integer, nullable=False)
     workout_type = Column(Enum('strength', 'cardio', 'flexibility'), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
+    # NOT NULL: по (created_at, id) строится курсор страниц
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    # Меняются при любом изменении тренировки или её упражнений; из них строится ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.now)
 
     user = relationship("User", back_populates="workouts")
-    exercises = relationship("Exercise", secondary=workout_exercises, back_populates="workouts")
+    # selectin: упражнения всех загруженных тренировок подтягиваются одним запросом с IN,
+    # а не отдельным SELECT на каждую тренировку
+    exercises = relationship("Exercise", secondary=workout_exercises, back_populates="workouts",
+                             lazy="selectin")
 
-    def to_dict(self):
+    def to_dict(self, exercises: list[dict] | None = None):
+        """exercises — уже сериализованные упражнения (например, из кэша); иначе берутся из self.exercises."""
+        if exercises is None:
+            exercises = [e.to_dict() for e in self.exercises]
         return {
             "id": self.id,
             "name": self.name,
@@ -30,5 +44,5 @@ class Workout(Base):
             "workout_type": self.workout_type,
             "user_id": self.user_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "exercises": [e.to_dict() for e in self.exercises]
+            "exercises": exercises
         }
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from fastapi import Response, Depends
 from fastapi import status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.security import verify_password, get_db, get_password_hash, create_user_header
+from core.hashing import hash_password, hashing_executor, verify_and_update_password
+from core.security import get_current_user, get_db, create_user_header
 from models.users import User
 from schemas.auth import LoginRequest
 from schemas.users import UserCreate, UserResponse
@@ -15,8 +17,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 5
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED, response_model=UserResponse,
              summary='Добавить пользователя')
-def create_user(user: UserCreate, response: Response, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def create_user(user: UserCreate, response: Response, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -26,27 +29,28 @@ def create_user(user: UserCreate, response: Response, db: Session = Depends(get_
     db_user = User(
         name=user.name,
         email=user.email,
-        password_hash=get_password_hash(user.password),
+        password_hash=await hash_password(user.password),
         experience_level=user.experience_level,
         goal=user.goal
     )
 
     try:
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
 
-        response.headers["Authorization"] = create_user_header(user.email)
+        response.headers["Authorization"] = create_user_header(db_user)
 
         return db_user
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while creating the user")
 
 
 @router.post("/login", status_code=status.HTTP_200_OK, summary='Войти в систему')
-def user_login(login_attempt: LoginRequest = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == login_attempt.email).first()
+async def user_login(login_attempt: LoginRequest = Depends(), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == login_attempt.email))
+    user = result.scalars().first()
 
     if not user:
         raise HTTPException(
@@ -54,8 +58,13 @@ def user_login(login_attempt: LoginRequest = Depends(), db: Session = Depends(ge
             detail=f"User {login_attempt.username} not found"
         )
 
-    if verify_password(login_attempt.password, user.password_hash):
-        access_token = create_user_header(user.email)
+    password_ok, new_hash = await verify_and_update_password(login_attempt.password, user.password_hash)
+    if password_ok:
+        if new_hash:
+            # Устаревший формат или стоимость хэша: пароль известен только сейчас, пересчитываем
+            user.password_hash = new_hash
+            await db.commit()
+        access_token = create_user_header(user)
         return {
             "access_token": access_token,
             "token_type": "bearer"
@@ -65,3 +74,8 @@ def user_login(login_attempt: LoginRequest = Depends(), db: Session = Depends(ge
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Wrong password for user {login_attempt.email}"
         )
+
+
+@router.get("/hashing-stats", summary='Состояние пула хэширования паролей')
+async def get_hashing_stats(current_user=Depends(get_current_user)):
+    return hashing_executor.stats()
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+from core.database import get_db
+from core.responses import json_response
+from core.security import get_current_user
+from schemas.exercises import ExerciseResponse, ExerciseType
+from services.exercises import exercise_cache_stats
+from services.search import search_exercises
+
+router = APIRouter(prefix="/exercises", tags=["Exercises"])
+
+SEARCH_TRUNCATED_HEADER = "X-Search-Truncated"
+
+
+@router.get("/search", response_model=list[ExerciseResponse])
+async def search(q: str = Query(min_length=1, max_length=200),
+                 exercise_type: ExerciseType | None = None,
+                 min_calories_per_minute: int | None = Query(None, ge=0),
+                 max_calories_per_minute: int | None = Query(None, ge=0),
+                 limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                 current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Лучшие по bm25 совпадения среди всех упражнений. Фильтры применяются к SEARCH_MAX_CANDIDATES лучшим
+    совпадениям: если их не хватило на limit, заголовок X-Search-Truncated: true.
+    """
+    if (min_calories_per_minute is not None and max_calories_per_minute is not None
+            and min_calories_per_minute > max_calories_per_minute):
+        raise HTTPException(status_code=400, detail="min_calories_per_minute is greater than max_calories_per_minute")
+    exercises, truncated = await search_exercises(db, q, exercise_type, min_calories_per_minute,
+                                                  max_calories_per_minute, limit)
+    # Список остаётся телом ответа; об усечении окна кандидатов сообщает заголовок
+    return json_response([e.to_dict() for e in exercises],
+                         headers={SEARCH_TRUNCATED_HEADER: "true" if truncated else "false"})
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(current_user=Depends(get_current_user)):
+    """Размер и счётчики попаданий/промахов кэша сериализованных упражнений."""
+    return exercise_cache_stats()
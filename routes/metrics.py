@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.admission import admission_limiters
+from core.hashing import hashing_executor
+from core.metrics import Gauge, render_metrics
+from core.security import token_cache
+from services.exercises import exercise_cache
+
+router = APIRouter(tags=["Metrics"])
+
+
+def _admission(field: str):
+    return lambda: {(prefix,): limiter.stats()[field] for prefix, limiter in admission_limiters}
+
+
+def _caches(field: str):
+    return lambda: {("token",): getattr(token_cache, field), ("exercise",): getattr(exercise_cache, field)}
+
+
+Gauge("admission_active_requests", "Requests being processed per admission rule", ("rule",),
+      collect=_admission("active"))
+Gauge("admission_waiting_requests", "Requests queued per admission rule", ("rule",), collect=_admission("waiting"))
+Gauge("admission_rejected_total", "Requests rejected with 503 per admission rule", ("rule",),
+      collect=_admission("rejected"))
+Gauge("cache_hits_total", "In-process cache hits", ("cache",), collect=_caches("hits"))
+Gauge("cache_misses_total", "In-process cache misses", ("cache",), collect=_caches("misses"))
+Gauge("password_hash_queue_depth", "Password hashing jobs waiting for a worker",
+      collect=lambda: {(): hashing_executor.stats()["queue_depth"]})
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
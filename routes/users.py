@@ -1,30 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from fastapi import status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.database import get_db
-from core.security import get_current_user
-from core.security import get_password_hash
+from core.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, USER_DELETE_SYNC_MAX_WORKOUTS
+from core.database import get_db, get_session_factory
+from core.hashing import hash_password
+from core.pagination import keyset_page, split_page
+from core.responses import json_response
+from core.security import get_current_user, revoke_user_tokens, forget_token_epoch
 from models.users import User
-from schemas.users import UserCreate, UserResponse
+from schemas.users import UserCreate, UserResponse, UserPage
+from services.users import count_workouts, delete_user_row, delete_user_with_workouts, purge_workouts
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-# GET /users - получить всех пользователей
-@router.get("/", response_model=list[UserResponse])
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+async def get_user_by_email(db: AsyncSession, user_email: str):
+    result = await db.execute(select(User).where(User.email == user_email))
+    return result.scalars().first()
+
+
+# GET /users - получить пользователей постранично
+@router.get("/", response_model=UserPage)
+async def get_users(cursor: str | None = None,
+                    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                    db: AsyncSession = Depends(get_db)):
+    result = await db.execute(keyset_page(select(User), User, cursor, limit))
+    users, next_cursor = split_page(result.scalars().all(), limit)
+    return {"items": users, "next_cursor": next_cursor}
 
 
 # GET /users/{user_email} - получить пользователя по email
 @router.get("/{user_email}", response_model=UserResponse)
-def get_user(user_email: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_user(user_email: str, db: AsyncSession = Depends(get_db),
+                   current_user=Depends(get_current_user)):
     if user_email != current_user.email:
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
                             detail="You can watch information only by your user.")
-    user = db.query(User).filter(User.email == user_email).first()
+    user = await get_user_by_email(db, user_email)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
@@ -32,8 +46,8 @@ def get_user(user_email: str, db: Session = Depends(get_db), current_user: User
 
 # PUT /users/{user_email} - обновить пользователя
 @router.put("/{user_email}", response_model=UserResponse)
-def update_user(user_email: str, user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user_email).first()
+async def update_user(user_email: str, user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await get_user_by_email(db, user_email)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -42,23 +56,40 @@ def update_user(user_email: str, user: UserCreate, db: Session = Depends(get_db)
     if user.email:
         db_user.email = user.email
     if user.password:
-        db_user.password_hash = get_password_hash(user.password)
+        db_user.password_hash = await hash_password(user.password)
     if user.experience_level:
         db_user.experience_level = user.experience_level
     if user.goal:
         db_user.goal = user.goal
+    revoke_user_tokens(db_user)
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    forget_token_epoch(db_user.id)
+    await db.refresh(db_user)
     return db_user
 
 
-# DELETE /users/{user_email}
-@router.delete("/{user_email}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_email: str, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user_email).first()
-    if not db_user:
+# DELETE /users/{user_email} - удалить пользователя вместе с тренировками
+@router.delete("/{user_email}", status_code=status.HTTP_204_NO_CONTENT,
+               responses={status.HTTP_202_ACCEPTED: {"description": "User deleted, workouts are purged in background"}})
+async def delete_user(user_email: str, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db),
+                      session_factory=Depends(get_session_factory)):
+    user_id = (await db.execute(select(User.id).where(User.email == user_email))).scalar()
+    if user_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    db.delete(db_user)
-    db.commit()
-    return {"detail": "User deleted"}
+
+    workouts = await count_workouts(db, user_id)
+    if workouts > USER_DELETE_SYNC_MAX_WORKOUTS:
+        # Одна транзакция на всю историю надолго заняла бы блокировку записи SQLite: пользователь удаляется сразу,
+        # его тренировки недоступны без токена и удаляются в фоне пачками
+        await delete_user_row(db, user_id)
+        await db.commit()
+        forget_token_epoch(user_id)
+        background_tasks.add_task(purge_workouts, session_factory, user_id)
+        return json_response({"detail": "User deleted, purging workouts", "workouts": workouts},
+                             status_code=status.HTTP_202_ACCEPTED)
+
+    await delete_user_with_workouts(db, user_id)
+    await db.commit()
+    forget_token_epoch(user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,176 +1,366 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-
-from core.database import get_db
+from collections import Counter
+from datetime import date
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+
+from core.conditional import etag_matches, not_modified
+from core.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, BULK_MAX_ITEMS
+from core.database import get_db, get_session_factory
+from core.pagination import keyset_page, split_page
+from core.responses import json_response
 from core.security import get_current_user
+from models.associations import workout_exercises
 from models.exercises import Exercise
 from models.workouts import Workout
 from schemas.exercises import ExerciseCreate, ExerciseResponse
-from schemas.workouts import WorkoutCreate, WorkoutResponse
+from schemas.workouts import ExportFormat, WorkoutImportReport, StatsBucket, WorkoutStats, WorkoutSummary
+from schemas.workouts import WorkoutCreate, WorkoutResponse, WorkoutPage, WorkoutBulkItem, WorkoutBulkResponse
+from services.exercises import get_exercise_dicts, get_workout_exercise_dicts
+from services.export import stream_csv, stream_ndjson
+from services.importer import import_workouts
+from services.stats import workout_stats
+from services.user_stats import apply_delta, get_user_stats, get_workouts_version, shift_exercise_calories
+from services.workouts import insert_workouts, touch_exercise_workouts, touch_workouts, workout_etag, workout_list_etag
 
 router = APIRouter(prefix="/workouts", tags=["Workouts"])
 
 
-def get_workout_by_id(db: Session, workout_id: int, user_id: int):
-    workout = db.query(Workout).options(joinedload(Workout.exercises)).filter(
+async def get_workout_by_id(db: AsyncSession, workout_id: int, user_id: int, with_exercises: bool = True):
+    """with_exercises=False — не загружать упражнения (чтения берут их через кэш упражнений)."""
+    query = select(Workout).where(
         Workout.id == workout_id,
         Workout.user_id == user_id
-    ).first()
+    )
+    if not with_exercises:
+        query = query.options(noload(Workout.exercises))
+    result = await db.execute(query)
+    workout = result.scalars().first()
     if not workout:
         raise HTTPException(status_code=404, detail="Workout not found or access denied")
     return workout
 
 
-def get_exercise_by_id(db: Session, exercise_id: int):
-    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
+async def ensure_workout_access(db: AsyncSession, workout_id: int, user_id: int):
+    """Проверяет владельца тренировки, не загружая её упражнения; возвращает строку (id, duration_minutes)."""
+    result = await db.execute(
+        select(Workout.id, Workout.duration_minutes).where(Workout.id == workout_id, Workout.user_id == user_id)
+    )
+    workout = result.first()
+    if workout is None:
+        raise HTTPException(status_code=404, detail="Workout not found or access denied")
+    return workout
+
+
+async def get_exercise_by_id(db: AsyncSession, exercise_id: int):
+    result = await db.execute(select(Exercise).where(Exercise.id == exercise_id))
+    exercise = result.scalars().first()
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
     return exercise
 
 
-@router.get("/", response_model=list[WorkoutResponse])
-def get_workouts(current_user: int = Depends(get_current_user), db: Session = Depends(get_db)):
-    workouts = db.query(Workout).filter(Workout.user_id == current_user.id).all()
-    return [w.to_dict() for w in workouts]
+@router.get("/", response_model=WorkoutPage)
+async def get_workouts(request: Request, cursor: str | None = None,
+                       limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                       current_user: int = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Версия читается до списка: если запись вклинится между запросами, ETag окажется старше данных,
+    # и следующий запрос просто получит ответ заново. Упражнения берутся из кэша по версиям из БД,
+    # поэтому устаревшая запись кэша не попадёт в ответ под новым ETag
+    etag = workout_list_etag(current_user.id, await get_workouts_version(db, current_user.id), cursor, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = select(Workout).options(noload(Workout.exercises)).where(Workout.user_id == current_user.id)
+    result = await db.execute(keyset_page(query, Workout, cursor, limit))
+    workouts, next_cursor = split_page(result.scalars().all(), limit)
+    exercises = await get_workout_exercise_dicts(db, [w.id for w in workouts])
+    return json_response({"items": [w.to_dict(exercises[w.id]) for w in workouts], "next_cursor": next_cursor},
+                         headers={"ETag": etag})
+
+
+@router.get("/stats", response_model=WorkoutStats)
+async def get_workout_stats(bucket: StatsBucket = StatsBucket.week, date_from: date | None = None,
+                            date_to: date | None = None, current_user=Depends(get_current_user),
+                            db: AsyncSession = Depends(get_db)):
+    """Калории, минуты и число тренировок по типам за дни, недели или месяцы; считается в SQL."""
+    return await workout_stats(db, current_user.id, bucket, date_from, date_to)
+
+
+@router.get("/summary", response_model=WorkoutSummary)
+async def get_workout_summary(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Сводка для дашборда: читается из user_stats по первичному ключу, история не пересчитывается."""
+    return await get_user_stats(db, current_user.id)
+
+
+@router.get("/export")
+async def export_workouts(export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+                          current_user=Depends(get_current_user), session_factory=Depends(get_session_factory)):
+    """
+    Выгружает всю историю тренировок с упражнениями потоком: данные читаются курсором порциями,
+    поэтому память не растёт с объёмом истории, а первые байты уходят до конца запроса.
+    """
+    if export_format == ExportFormat.csv:
+        return StreamingResponse(stream_csv(session_factory, current_user.id), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="workouts.csv"'})
+    return StreamingResponse(stream_ndjson(session_factory, current_user.id), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="workouts.ndjson"'})
 
 
 @router.get("/{workout_id}", response_model=WorkoutResponse)
-def get_workout(workout_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
+async def get_workout(workout_id: int, request: Request, current_user=Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    workout = await get_workout_by_id(db, workout_id, current_user.id, with_exercises=False)
+    # Изменение упражнения меняет version тренировки в той же транзакции, а упражнения берутся из кэша
+    # по версиям, прочитанным после тренировки: тело не старше ETag, в каком бы воркере ни было изменение
+    etag = workout_etag(workout)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return workout.to_dict()
+    exercises = await get_workout_exercise_dicts(db, [workout.id])
+    return json_response(workout.to_dict(exercises[workout.id]), headers={"ETag": etag})
 
 
 @router.post("/", response_model=WorkoutResponse, status_code=status.HTTP_201_CREATED)
-def create_workout(workout: WorkoutCreate, current_user=Depends(get_current_user),
-                   db: Session = Depends(get_db)):
+async def create_workout(workout: WorkoutCreate, current_user=Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
     db_workout = Workout(
         name=workout.name,
         description=workout.description,
         duration_minutes=workout.duration_minutes,
         workout_type=workout.workout_type,
-        user_id=current_user.id
+        user_id=current_user.id,
+        exercises=[]
     )
 
     db.add(db_workout)
-    db.commit()
-    db.refresh(db_workout)
-    return db_workout.to_dict()
+    await db.flush()
+    await apply_delta(db, current_user.id, workouts=1, minutes=workout.duration_minutes,
+                      by_type={workout.workout_type: 1})
+    await db.commit()
+    return json_response(db_workout.to_dict(), status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/bulk", response_model=WorkoutBulkResponse, status_code=status.HTTP_201_CREATED)
+async def create_workouts_bulk(items: Annotated[list[Any], Body(max_length=BULK_MAX_ITEMS)],
+                               current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Создаёт тренировки (с вложенными упражнениями) одной транзакцией.
+    Элементы проверяются по отдельности: невалидные попадают в errors и не мешают остальным.
+    """
+    valid_items, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            valid_items.append(WorkoutBulkItem.model_validate(item))
+            positions.append(index)
+        except ValidationError as e:
+            errors.append({
+                "index": index,
+                "errors": [{"loc": err["loc"], "msg": err["msg"], "type": err["type"]} for err in e.errors()]
+            })
+
+    workout_ids = await insert_workouts(db, current_user.id, valid_items)
+    await db.commit()
+
+    ids = [None] * len(items)
+    for index, workout_id in zip(positions, workout_ids):
+        ids[index] = workout_id
+    return {"ids": ids, "errors": errors}
+
+
+@router.post("/import", response_model=WorkoutImportReport)
+async def import_workouts_from_file(request: Request,
+                                    import_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+                                    current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Импортирует тренировки с упражнениями из тела запроса (NDJSON или CSV в формате /workouts/export).
+    Тело разбирается по мере чтения и вставляется пачками по IMPORT_BATCH_SIZE в отдельных транзакциях.
+    """
+    return await import_workouts(db, current_user.id, request.stream(), import_format)
 
 
 @router.put("/{workout_id}", response_model=WorkoutResponse)
-def update_workout(workout_id: int, updated_data: WorkoutCreate, current_user=Depends(get_current_user),
-                   db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
+async def update_workout(workout_id: int, updated_data: WorkoutCreate, current_user=Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
+    workout = await get_workout_by_id(db, workout_id, current_user.id)
+    old_duration, old_type = workout.duration_minutes, workout.workout_type
 
     for key, value in updated_data.dict().items():
         setattr(workout, key, value)
 
-    db.commit()
-    db.refresh(workout)
-    return workout.to_dict()
+    type_change = Counter({old_type: -1})
+    type_change[workout.workout_type] += 1
+    calories_per_minute = sum(e.calories_per_minute for e in workout.exercises)
+    await apply_delta(
+        db, current_user.id,
+        minutes=workout.duration_minutes - old_duration,
+        calories=(workout.duration_minutes - old_duration) * calories_per_minute,
+        by_type=type_change
+    )
+    await touch_workouts(db, Workout.id == workout_id)
+    await db.commit()
+    return json_response(workout.to_dict())
 
 
 @router.delete("/{workout_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_workout(workout_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
-    db.delete(workout)
-    db.commit()
+async def delete_workout(workout_id: int, current_user=Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
+    workout = await get_workout_by_id(db, workout_id, current_user.id)
+    await db.delete(workout)
+    await db.flush()
+    await apply_delta(
+        db, current_user.id,
+        workouts=-1,
+        minutes=-workout.duration_minutes,
+        calories=-workout.duration_minutes * sum(e.calories_per_minute for e in workout.exercises),
+        by_type={workout.workout_type: -1}
+    )
+    await db.commit()
     return {"detail": "Workout deleted"}
 
 
 @router.post("/{workout_id}/add-exercise", status_code=status.HTTP_200_OK)
-def add_exercise_to_workout(workout_id: int, exercise_id: int, current_user=Depends(get_current_user),
-                            db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
-    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
-    if not exercise:
-        raise HTTPException(status_code=404, detail="Exercise not found")
+async def add_exercise_to_workout(workout_id: int, exercise_id: int | None = None,
+                                  exercise_ids: list[int] = Query(default=[], max_length=BULK_MAX_ITEMS),
+                                  current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Связывает с тренировкой одно (exercise_id) или несколько (exercise_ids) упражнений.
+    Число запросов не зависит ни от длины списка, ни от числа упражнений, уже входящих в тренировку.
+    """
+    requested_ids = set(exercise_ids)
+    if exercise_id is not None:
+        requested_ids.add(exercise_id)
+    if not requested_ids:
+        raise HTTPException(status_code=400, detail="No exercise ids given")
+
+    workout = await ensure_workout_access(db, workout_id, current_user.id)
 
-    if exercise in workout.exercises:
+    result = await db.execute(
+        select(Exercise.id, Exercise.calories_per_minute).where(Exercise.id.in_(requested_ids))
+    )
+    calories_per_minute = dict(result.all())
+    missing_ids = requested_ids - calories_per_minute.keys()
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Exercise not found: {sorted(missing_ids)}")
+
+    result = await db.execute(
+        select(workout_exercises.c.exercise_id).where(
+            workout_exercises.c.workout_id == workout_id,
+            workout_exercises.c.exercise_id.in_(requested_ids)
+        )
+    )
+    linked_ids = set(result.scalars())
+    new_ids = sorted(requested_ids - linked_ids)
+    if not new_ids:
         raise HTTPException(status_code=400, detail="Exercise already in workout")
 
-    workout.exercises.append(exercise)
-    db.commit()
-    return {"detail": "Exercise added to workout"}
+    # Один многострочный INSERT на все новые связи
+    await db.execute(
+        insert(workout_exercises).values([{"workout_id": workout_id, "exercise_id": i} for i in new_ids])
+    )
+    await apply_delta(db, current_user.id,
+                      calories=workout.duration_minutes * sum(calories_per_minute[i] for i in new_ids))
+    await touch_workouts(db, Workout.id == workout_id)
+    await db.commit()
+    return {"detail": "Exercise added to workout", "added": new_ids, "already_linked": sorted(linked_ids)}
 
 
 @router.post("/{workout_id}/exercises", response_model=ExerciseResponse, status_code=status.HTTP_201_CREATED)
-def create_exercise_and_link_to_workout(
+async def create_exercise_and_link_to_workout(
         workout_id: int,
         exercise_data: ExerciseCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
     Создаёт новое упражнение и сразу связывает его с указанной тренировкой.
     """
     # Получаем тренировку
-    workout = get_workout_by_id(db, workout_id, current_user.id)
+    workout = await get_workout_by_id(db, workout_id, current_user.id)
 
     # Создаём упражнение
     db_exercise = Exercise(**exercise_data.dict())
     db.add(db_exercise)
-    db.flush()  # Чтобы получить ID упражнения
+    await db.flush()  # Чтобы получить ID упражнения
 
     # Связываем через many-to-many
     workout.exercises.append(db_exercise)
-    db.commit()
-    db.refresh(db_exercise)
+    await apply_delta(db, current_user.id, calories=workout.duration_minutes * db_exercise.calories_per_minute)
+    await touch_workouts(db, Workout.id == workout_id)
+    await db.commit()
 
-    return db_exercise.to_dict()
+    return json_response(db_exercise.to_dict(), status_code=status.HTTP_201_CREATED)
 
 
 @router.get("/{workout_id}/exercises", response_model=list[ExerciseResponse])
-def get_exercises_in_workout(workout_id: int, current_user=Depends(get_current_user),
-                             db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
-    return [e.to_dict() for e in workout.exercises]
+async def get_exercises_in_workout(workout_id: int, current_user=Depends(get_current_user),
+                                   db: AsyncSession = Depends(get_db)):
+    await ensure_workout_access(db, workout_id, current_user.id)
+    exercises = await get_workout_exercise_dicts(db, [workout_id])
+    return json_response(exercises[workout_id])
 
 
 @router.get("/{workout_id}/exercises/{exercise_id}", response_model=ExerciseResponse)
-def get_exercise_in_workout(workout_id: int, exercise_id: int, current_user=Depends(get_current_user),
-                            db: Session = Depends(get_db)):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
-    exercise = next((e for e in workout.exercises if e.id == exercise_id), None)
-    if not exercise:
+async def get_exercise_in_workout(workout_id: int, exercise_id: int, current_user=Depends(get_current_user),
+                                  db: AsyncSession = Depends(get_db)):
+    await ensure_workout_access(db, workout_id, current_user.id)
+    result = await db.execute(
+        select(Exercise.version).join(workout_exercises, workout_exercises.c.exercise_id == Exercise.id).where(
+            workout_exercises.c.workout_id == workout_id,
+            workout_exercises.c.exercise_id == exercise_id
+        )
+    )
+    version = result.scalar()
+    if version is None:
         raise HTTPException(status_code=404, detail="Exercise not found in this workout")
-    return exercise.to_dict()
+    exercises = await get_exercise_dicts(db, {exercise_id: version})
+    return json_response(exercises[exercise_id])
 
 
 @router.put("/{workout_id}/exercises/{exercise_id}", response_model=ExerciseResponse)
-def update_exercise_in_workout(
+async def update_exercise_in_workout(
         workout_id: int,
         exercise_id: int,
         updated_data: ExerciseCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
+    workout = await get_workout_by_id(db, workout_id, current_user.id)
     exercise = next((e for e in workout.exercises if e.id == exercise_id), None)
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found in this workout")
 
+    old_calories_per_minute = exercise.calories_per_minute
     for key, value in updated_data.dict(exclude_unset=True).items():
         setattr(exercise, key, value)
+    # Новая версия — новый ключ кэша во всех воркерах; инкремент в SQL не теряется при параллельных изменениях
+    exercise.version = Exercise.version + 1
 
-    db.commit()
-    db.refresh(exercise)
-    return exercise.to_dict()
+    await shift_exercise_calories(db, exercise.id, exercise.calories_per_minute - old_calories_per_minute)
+    await touch_exercise_workouts(db, exercise.id)
+    await db.commit()
+    return json_response(exercise.to_dict())
 
 
 @router.delete("/{workout_id}/exercises/{exercise_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_exercise_from_workout(
+async def delete_exercise_from_workout(
         workout_id: int,
         exercise_id: int,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    workout = get_workout_by_id(db, workout_id, current_user.id)
+    workout = await get_workout_by_id(db, workout_id, current_user.id)
     exercise = next((e for e in workout.exercises if e.id == exercise_id), None)
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found in this workout")
 
     workout.exercises.remove(exercise)
-    db.commit()
+    await apply_delta(db, current_user.id, calories=-workout.duration_minutes * exercise.calories_per_minute)
+    await touch_workouts(db, Workout.id == workout_id)
+    await db.commit()
     return {"detail": "Exercise removed from workout"}
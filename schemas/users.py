@@ -37,3 +37,9 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+
+
+# Страница списка пользователей
+class UserPage(BaseModel):
+    items: list[UserResponse]
+    next_cursor: Optional[str] = None
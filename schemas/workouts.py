@@ -1,9 +1,10 @@
 from enum import Enum
-from typing import Optional, List
+from datetime import date
+from typing import Optional, List, Dict
 
 from pydantic import BaseModel
 
-from .exercises import ExerciseResponse
+from .exercises import ExerciseCreate, ExerciseResponse
 
 
 class WorkoutType(str, Enum):
@@ -12,6 +13,17 @@ class WorkoutType(str, Enum):
     flexibility = "flexibility"
 
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class StatsBucket(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
 class WorkoutBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -23,6 +35,29 @@ class WorkoutCreate(WorkoutBase):
     pass
 
 
+class WorkoutBulkItem(WorkoutCreate):
+    exercises: List[ExerciseCreate] = []
+
+
+class WorkoutBulkError(BaseModel):
+    index: int
+    errors: List[dict]
+
+
+class WorkoutBulkResponse(BaseModel):
+    # id созданных тренировок в порядке входного списка; None для отклонённых элементов
+    ids: List[Optional[int]]
+    errors: List[WorkoutBulkError] = []
+
+
+class WorkoutImportReport(BaseModel):
+    processed: int
+    imported: int
+    failed: int
+    # Ошибки по номеру строки (для CSV — первой строки тренировки), не больше IMPORT_MAX_REPORTED_ERRORS
+    errors: List[dict] = []
+
+
 class WorkoutResponse(WorkoutBase):
     id: int
     user_id: int
@@ -31,3 +66,31 @@ class WorkoutResponse(WorkoutBase):
 
     class Config:
         from_attributes = True
+
+
+class WorkoutPage(BaseModel):
+    items: List[WorkoutResponse]
+    next_cursor: Optional[str] = None
+
+
+class WorkoutStatsPeriod(BaseModel):
+    # Начало периода: день, понедельник недели или первое число месяца
+    period: Optional[date] = None
+    workouts: int
+    total_minutes: int
+    calories: int
+    by_type: Dict[WorkoutType, int]
+
+
+class WorkoutStats(BaseModel):
+    bucket: StatsBucket
+    totals: WorkoutStatsPeriod
+    periods: List[WorkoutStatsPeriod]
+
+
+class WorkoutSummary(BaseModel):
+    total_workouts: int
+    total_minutes: int
+    total_calories: int
+    by_type: Dict[WorkoutType, int]
+    last_workout_at: Optional[str] = None
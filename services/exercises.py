@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import LRUCache
+from core.config import EXERCISE_CACHE_SIZE, EXERCISE_CACHE_TTL_SECONDS
+from models.associations import workout_exercises
+from models.exercises import Exercise
+
+# Сериализованные упражнения (Exercise.to_dict()) по (id, version). Упражнения общие для многих тренировок,
+# поэтому чтения берут их отсюда, а из БД — только связи с версиями упражнений и промахи кэша.
+# Версия читается из БД в том же запросе, поэтому запись, положенная запоздавшим чтением или оставшаяся в кэше
+# другого воркера, после изменения упражнения просто не запрашивается; явная инвалидация не нужна
+exercise_cache = LRUCache(EXERCISE_CACHE_SIZE, ttl=EXERCISE_CACHE_TTL_SECONDS)
+
+
+def exercise_cache_stats() -> dict:
+    return {"size": len(exercise_cache), "maxsize": exercise_cache.maxsize,
+            "hits": exercise_cache.hits, "misses": exercise_cache.misses}
+
+
+async def get_exercise_dicts(db: AsyncSession, exercise_versions: dict[int, int]) -> dict[int, dict]:
+    """
+    Возвращает сериализованные упражнения по {id: version}; промахи догружаются одним запросом с IN.
+    Догруженная строка может оказаться новее запрошенной версии — она кэшируется под своей версией.
+    """
+    found, missing = {}, []
+    for exercise_id, version in exercise_versions.items():
+        cached = exercise_cache.get((exercise_id, version))
+        if cached is None:
+            missing.append(exercise_id)
+        else:
+            found[exercise_id] = cached
+
+    if missing:
+        result = await db.execute(select(Exercise).where(Exercise.id.in_(missing)))
+        for exercise in result.scalars():
+            found[exercise.id] = exercise.to_dict()
+            exercise_cache.set((exercise.id, exercise.version), found[exercise.id])
+    return found
+
+
+async def get_workout_exercise_dicts(db: AsyncSession, workout_ids) -> dict[int, list[dict]]:
+    """
+    Упражнения тренировок: из БД читаются связи (workout_id, exercise_id) с версиями упражнений
+    (по первичному ключу exercises), сами упражнения — из кэша.
+    """
+    workout_ids = list(workout_ids)
+    if not workout_ids:
+        return {}
+    result = await db.execute(
+        select(workout_exercises.c.workout_id, workout_exercises.c.exercise_id, Exercise.version)
+        .join(Exercise, Exercise.id == workout_exercises.c.exercise_id)
+        .where(workout_exercises.c.workout_id.in_(workout_ids))
+        .order_by(workout_exercises.c.workout_id, workout_exercises.c.exercise_id)
+    )
+    links = result.all()
+    exercises = await get_exercise_dicts(db, {exercise_id: version for _, exercise_id, version in links})
+
+    by_workout = defaultdict(list)
+    for workout_id, exercise_id, _ in links:
+        by_workout[workout_id].append(exercises[exercise_id])
+    return {workout_id: by_workout[workout_id] for workout_id in workout_ids}
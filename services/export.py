@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from core.config import EXPORT_CHUNK_SIZE
+from models.associations import workout_exercises
+from models.exercises import Exercise
+from models.workouts import Workout
+
+CSV_COLUMNS = [
+    "workout_id", "workout_name", "workout_description", "duration_minutes", "workout_type", "workout_created_at",
+    "exercise_id", "exercise_name", "exercise_description", "calories_per_minute", "exercise_type",
+    "exercise_created_at",
+]
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def export_query(user_id: int):
+    # Строка на каждую пару тренировка-упражнение; тренировки без упражнений дают одну строку с NULL
+    return (
+        select(
+            Workout.id, Workout.name, Workout.description, Workout.duration_minutes, Workout.workout_type,
+            Workout.created_at, Exercise.id, Exercise.name, Exercise.description, Exercise.calories_per_minute,
+            Exercise.exercise_type, Exercise.created_at,
+        )
+        .select_from(Workout)
+        .outerjoin(workout_exercises, workout_exercises.c.workout_id == Workout.id)
+        .outerjoin(Exercise, Exercise.id == workout_exercises.c.exercise_id)
+        .where(Workout.user_id == user_id)
+        .order_by(Workout.created_at, Workout.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+
+async def iter_export_chunks(session_factory: async_sessionmaker, user_id: int):
+    """Читает историю курсором порциями по EXPORT_CHUNK_SIZE строк и отдаёт каждую порцию списком строк."""
+    async with session_factory() as db:
+        result = await db.stream(export_query(user_id))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def stream_ndjson(session_factory: async_sessionmaker, user_id: int):
+    """Одна строка JSON на тренировку, упражнения вложены списком."""
+    current = None
+    async for partition in iter_export_chunks(session_factory, user_id):
+        lines = []
+        for row in partition:
+            if current is None or current["id"] != row[0]:
+                if current is not None:
+                    lines.append(json.dumps(current, ensure_ascii=False))
+                current = {
+                    "id": row[0], "name": row[1], "description": row[2], "duration_minutes": row[3],
+                    "workout_type": row[4], "created_at": _isoformat(row[5]), "exercises": [],
+                }
+            if row[6] is not None:
+                current["exercises"].append({
+                    "id": row[6], "name": row[7], "description": row[8], "calories_per_minute": row[9],
+                    "exercise_type": row[10], "created_at": _isoformat(row[11]),
+                })
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+    if current is not None:
+        yield (json.dumps(current, ensure_ascii=False) + "\n").encode()
+
+
+async def stream_csv(session_factory: async_sessionmaker, user_id: int):
+    """Плоский CSV: строка на каждую пару тренировка-упражнение."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for partition in iter_export_chunks(session_factory, user_id):
+        writer.writerows(
+            [*row[:5], _isoformat(row[5]), *row[6:11], _isoformat(row[11])] for row in partition
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,144 @@
+import codecs
+import csv
+import json
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import IMPORT_BATCH_SIZE, IMPORT_MAX_REPORTED_ERRORS
+from schemas.workouts import ExportFormat, WorkoutBulkItem
+from services.workouts import insert_workouts
+
+logger = logging.getLogger(__name__)
+
+
+async def iter_lines(chunks):
+    """Режет поток байтов на строки, не держа в памяти больше одной неполной строки."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_ndjson_records(lines):
+    """(номер строки, тренировка или None, ошибка или None) для каждой непустой строки NDJSON."""
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+
+
+async def iter_csv_rows(lines):
+    # Запись CSV может занимать несколько строк, если в кавычках есть перевод строки:
+    # строки копятся, пока число кавычек не станет чётным
+    pending = ""
+    async for line in lines:
+        pending += line
+        if pending.count('"') % 2 == 0:
+            yield next(csv.reader([pending]))
+            pending = ""
+    if pending:
+        yield next(csv.reader([pending]))
+
+
+def _csv_value(row: dict, column: str):
+    value = row.get(column)
+    return value if value not in ("", None) else None
+
+
+async def iter_csv_records(lines):
+    """
+    Читает CSV в формате выгрузки (services.export.CSV_COLUMNS). Подряд идущие строки с одинаковым workout_id
+    собираются в одну тренировку; колонки exercise_* задают её упражнения.
+    """
+    header = None
+    current, current_ref, current_number = None, None, 0
+    number = 0
+    async for values in iter_csv_rows(lines):
+        number += 1
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = {"workout_name", "duration_minutes", "workout_type"} - set(header)
+            if missing:
+                yield number, None, f"Missing CSV columns: {sorted(missing)}"
+                return
+            continue
+        if not any(values):
+            continue
+        row = dict(zip(header, values))
+        ref = _csv_value(row, "workout_id")
+        if current is None or ref is None or ref != current_ref:
+            if current is not None:
+                yield current_number, current, None
+            current = {
+                "name": _csv_value(row, "workout_name"),
+                "description": _csv_value(row, "workout_description"),
+                "duration_minutes": _csv_value(row, "duration_minutes"),
+                "workout_type": _csv_value(row, "workout_type"),
+                "exercises": [],
+            }
+            current_ref, current_number = ref, number
+        if _csv_value(row, "exercise_name") is not None:
+            current["exercises"].append({
+                "name": _csv_value(row, "exercise_name"),
+                "description": _csv_value(row, "exercise_description"),
+                "calories_per_minute": _csv_value(row, "calories_per_minute"),
+                "exercise_type": _csv_value(row, "exercise_type"),
+            })
+    if current is not None:
+        yield current_number, current, None
+
+
+async def import_workouts(db: AsyncSession, user_id: int, chunks, import_format: ExportFormat,
+                          on_progress=None) -> dict:
+    """
+    Потоково импортирует тренировки с упражнениями из NDJSON или CSV (формат выгрузки /workouts/export).
+    Каждые IMPORT_BATCH_SIZE валидных тренировок вставляются и фиксируются отдельной транзакцией;
+    в памяти держится только текущая пачка. on_progress(report) вызывается после каждой пачки.
+    """
+    report = {"processed": 0, "imported": 0, "failed": 0, "errors": []}
+    lines = iter_lines(chunks)
+    records = iter_csv_records(lines) if import_format == ExportFormat.csv else iter_ndjson_records(lines)
+
+    def add_error(number, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": number, "errors": errors})
+
+    async def flush(batch):
+        await insert_workouts(db, user_id, batch)
+        await db.commit()
+        report["imported"] += len(batch)
+        logger.info("Imported %s workouts for user %s", report["imported"], user_id)
+        if on_progress:
+            on_progress(report)
+
+    batch = []
+    async for number, record, error in records:
+        report["processed"] += 1
+        if error:
+            add_error(number, [{"msg": error}])
+            continue
+        try:
+            batch.append(WorkoutBulkItem.model_validate(record))
+        except ValidationError as e:
+            add_error(number, [{"loc": err["loc"], "msg": err["msg"], "type": err["type"]} for err in e.errors()])
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return report
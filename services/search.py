@@ -0,0 +1,82 @@
+import re
+
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import SEARCH_MAX_CANDIDATES
+from models.exercises import EXERCISE_FTS_DDL, Exercise
+from schemas.exercises import ExerciseType
+
+exercises_fts = table("exercises_fts", column("rowid"))
+# Вес совпадения в названии выше, чем в описании
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+RANK_FUNCTION = f"bm25({NAME_WEIGHT}, {DESCRIPTION_WEIGHT})"
+
+_TERM = re.compile(r"\w+")
+
+
+def fts_match_query(query: str) -> str | None:
+    """
+    Превращает пользовательский ввод в запрос FTS5: каждое слово — префиксный терм в кавычках,
+    термы объединяются через AND. Операторы FTS5 во вводе не интерпретируются.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_exercises(db: AsyncSession, query: str, exercise_type: ExerciseType | None = None,
+                           min_calories_per_minute: int | None = None,
+                           max_calories_per_minute: int | None = None,
+                           limit: int = 50) -> tuple[list[Exercise], bool]:
+    """
+    Возвращает найденные упражнения и признак усечения. Ранжирует FTS5 по всем совпадениям и отдаёт
+    SEARCH_MAX_CANDIDATES лучших, фильтры применяются к ним. Усечение (True) возможно, только если после
+    фильтров осталось меньше limit, а совпадений больше SEARCH_MAX_CANDIDATES: подходящие упражнения могли
+    остаться среди менее релевантных.
+    """
+    match = fts_match_query(query)
+    if match is None:
+        return [], False
+
+    fts_matches = (
+        select(exercises_fts.c.rowid.label("id"))
+        .where(literal_column("exercises_fts").match(match))
+    )
+    # ORDER BY rank LIMIT выполняет сам FTS5, не передавая в SQLite все совпадения; веса задаёт rank MATCH
+    candidates = (
+        fts_matches.add_columns(literal_column("rank").label("score"))
+        .where(literal_column("rank").match(RANK_FUNCTION))
+        .order_by(literal_column("rank"))
+        .limit(SEARCH_MAX_CANDIDATES)
+        .subquery()
+    )
+    statement = (
+        select(Exercise)
+        .join(candidates, candidates.c.id == Exercise.id)
+        .order_by(candidates.c.score, Exercise.id)
+        .limit(limit)
+    )
+    if exercise_type is not None:
+        statement = statement.where(Exercise.exercise_type == exercise_type.value)
+    if min_calories_per_minute is not None:
+        statement = statement.where(Exercise.calories_per_minute >= min_calories_per_minute)
+    if max_calories_per_minute is not None:
+        statement = statement.where(Exercise.calories_per_minute <= max_calories_per_minute)
+
+    exercises = (await db.execute(statement)).scalars().all()
+    if len(exercises) == limit:
+        # Всё, что не вошло в кандидаты, ранжируется ниже: полная страница совпадает с глобальным топом
+        return exercises, False
+    beyond_candidates = await db.execute(fts_matches.limit(1).offset(SEARCH_MAX_CANDIDATES))
+    return exercises, beyond_candidates.first() is not None
+
+
+async def rebuild_search_index(db: AsyncSession):
+    """Создаёт индекс и триггеры, если их нет (база создана до появления поиска), и переиндексирует exercises."""
+    for statement in EXERCISE_FTS_DDL:
+        await db.execute(text(statement))
+    await db.execute(text("INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')"))
+    await db.commit()
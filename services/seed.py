@@ -0,0 +1,267 @@
+"""
+Наполнение базы синтетическими пользователями, упражнениями, тренировками и связями для нагрузочных
+тестов и оценки объёмов. Один и тот же seed на пустой базе даёт одну и ту же базу.
+"""
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+from alembic import command
+from sqlalchemy import Engine, func, select
+
+from core.config import SEED_BATCH_SIZE
+from core.hashing import password_context
+from core.schema import alembic_config, missing_indexes
+from models.associations import workout_exercises
+from models.exercises import EXERCISE_FTS_DDL, Exercise
+from models.user_stats import UserStats
+from models.users import User
+from models.workouts import Workout
+from schemas.exercises import ExerciseType
+from schemas.users import UserExperience, UserGoal
+from schemas.workouts import WorkoutType
+
+SEED_PASSWORD = "password"
+SEED_START = datetime(2024, 1, 1)
+SEED_DAYS = 365
+
+SEEDED_TABLES = [User.__table__, Exercise.__table__, Workout.__table__, workout_exercises, UserStats.__table__]
+
+FIRST_NAMES = ["Anna", "Boris", "Daria", "Egor", "Irina", "Kirill", "Maria", "Nikita", "Olga", "Pavel"]
+LAST_NAMES = ["Ivanov", "Petrova", "Smirnov", "Kuznetsova", "Popov", "Sokolova", "Lebedev", "Kozlova"]
+WORKOUT_NAMES = {
+    WorkoutType.strength: ["Upper body", "Lower body", "Full body", "Push day", "Pull day", "Leg day"],
+    WorkoutType.cardio: ["Easy run", "Intervals", "Cycling", "Rowing", "Swimming"],
+    WorkoutType.flexibility: ["Yoga", "Stretching", "Mobility", "Pilates"],
+}
+EXERCISE_NAMES = {
+    ExerciseType.strength: ["Squat", "Deadlift", "Bench press", "Row", "Lunge", "Overhead press", "Curl"],
+    ExerciseType.cardio: ["Jumping jacks", "Burpees", "Mountain climbers", "Skipping", "Sprint", "Swing"],
+    ExerciseType.flexibility: ["Hamstring stretch", "Hip opener", "Cat cow", "Cobra", "Child pose"],
+}
+EXERCISE_MODIFIERS = ["Barbell", "Dumbbell", "Kettlebell", "Cable", "Bodyweight", "Band", "Single-leg", "Tempo"]
+# Диапазоны calories_per_minute и длительности тренировки (в минутах) по типу
+CALORIES_PER_MINUTE = {ExerciseType.strength: (4, 9), ExerciseType.cardio: (7, 14), ExerciseType.flexibility: (2, 4)}
+DURATION_MINUTES = {WorkoutType.strength: (30, 90), WorkoutType.cardio: (15, 75), WorkoutType.flexibility: (10, 60)}
+
+
+def parse_distribution(spec: str):
+    """
+    Распределение целого числа на объект: fixed:N, uniform:A-B или geometric:M (длинный хвост со средним M —
+    большинство пользователей тренируются редко, немногие — очень часто). Возвращает функцию rng -> int.
+    """
+    kind, _, value = spec.partition(":")
+    try:
+        if kind == "fixed":
+            count = int(value)
+            if count >= 0:
+                return lambda rng: count
+        elif kind == "uniform":
+            low, high = (int(bound) for bound in value.split("-"))
+            if 0 <= low <= high:
+                return lambda rng: rng.randint(low, high)
+        elif kind == "geometric":
+            mean = float(value)
+            if mean > 0:
+                log_q = math.log(mean / (mean + 1))
+                return lambda rng: int(math.log(1.0 - rng.random()) / log_q)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid distribution {spec!r}: expected fixed:N, uniform:A-B or geometric:MEAN")
+
+
+def parse_type_mix(spec: str | None, enum) -> tuple[list, list]:
+    """
+    Доли значений перечисления: "strength=5,cardio=3,flexibility=2" (не названные значения не выпадают).
+    None — равные доли. Возвращает (значения, накопленные веса) для rng.choices.
+    """
+    if not spec:
+        weights = {member: 1.0 for member in enum}
+    else:
+        weights = {}
+        for part in spec.split(","):
+            name, _, weight = part.partition("=")
+            try:
+                weights[enum(name.strip())] = float(weight)
+            except ValueError:
+                raise ValueError(f"Invalid type mix {spec!r}: expected name=weight,... over "
+                                 f"{', '.join(member.value for member in enum)}")
+        if sum(weights.values()) <= 0 or min(weights.values()) < 0:
+            raise ValueError(f"Invalid type mix {spec!r}: weights must be non-negative with a positive sum")
+    members = list(weights)
+    cumulative, total = [], 0.0
+    for member in members:
+        total += weights[member]
+        cumulative.append(total)
+    return members, cumulative
+
+
+def _timestamp(value: datetime) -> str:
+    # Тот же формат, что пишет тип DateTime в SQLite: строки сравниваются как даты, в том числе в курсорах
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _password_hash(rng: random.Random) -> str:
+    # Соль из rng, а не из os.urandom: иначе хэш, а с ним и база, отличались бы от запуска к запуску
+    alphabet = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    salt = "".join(rng.choice(alphabet) for _ in range(21)) + rng.choice(".Oeu")
+    rounds = password_context.default.rounds
+    return bcrypt.hashpw(SEED_PASSWORD.encode(), f"$2b${rounds:02d}${salt}".encode()).decode()
+
+
+class _BulkWriter:
+    """
+    Копит строки по таблицам и пишет их executemany через соединение SQLAlchemy, минуя обработку
+    параметров Core построчно. Каждый сброс — одна транзакция; таблицы пишутся в порядке внешних ключей.
+    """
+
+    def __init__(self, conn, columns: dict, batch_size: int, on_progress=None):
+        self.conn = conn
+        self.statements = {
+            table: f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            for table, names in columns.items()
+        }
+        self.rows = {table: [] for table in columns}
+        self.counts = {table: 0 for table in columns}
+        self.pending = 0
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+
+    def add(self, table: str, row: tuple):
+        self.rows[table].append(row)
+        self.pending += 1
+
+    def flush_if_full(self):
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table, rows in self.rows.items():
+            if rows:
+                self.conn.exec_driver_sql(self.statements[table], rows)
+                self.counts[table] += len(rows)
+                rows.clear()
+        self.conn.commit()
+        self.pending = 0
+        if self.on_progress:
+            self.on_progress(dict(self.counts))
+
+
+def drop_indexes(conn):
+    """Снимает вторичные индексы и триггер полнотекстового индекса перед массовой загрузкой."""
+    for table in SEEDED_TABLES:
+        for index in table.indexes:
+            index.drop(conn, checkfirst=True)
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS exercises_fts_insert")
+
+
+def create_indexes(conn):
+    """Создаёт недостающие индексы моделей и перестраивает полнотекстовый индекс упражнений."""
+    for index in missing_indexes(conn):
+        index.create(conn)
+    for statement in EXERCISE_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql("INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')")
+
+
+def seed_database(engine: Engine, users: int, exercises: int, workouts_per_user: str = "geometric:20",
+                  exercises_per_workout: str = "uniform:2-6", workout_types: str | None = None,
+                  exercise_types: str | None = None, seed: int = 0, batch_size: int = SEED_BATCH_SIZE,
+                  defer_indexes: bool = False, on_progress=None) -> dict:
+    """
+    Добавляет users пользователей (пароль SEED_PASSWORD) и exercises упражнений, тренировки со связями
+    по распределениям и сводку user_stats для новых пользователей. id продолжают существующие,
+    поэтому наполнять можно и непустую базу. С defer_indexes вторичные индексы снимаются на время загрузки
+    и строятся один раз в конце — это в разы быстрее, но до конца загрузки запросы к базе идут без индексов.
+    """
+    workouts_count = parse_distribution(workouts_per_user)
+    links_count = parse_distribution(exercises_per_workout)
+    workout_type_values, workout_type_weights = parse_type_mix(workout_types, WorkoutType)
+    exercise_type_values, exercise_type_weights = parse_type_mix(exercise_types, ExerciseType)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    command.upgrade(alembic_config(engine.url.render_as_string(hide_password=False)), "head")
+    with engine.connect() as conn:
+        first_user, first_exercise, first_workout = (
+            conn.execute(select(func.coalesce(func.max(model.id), 0))).scalar() + 1
+            for model in (User, Exercise, Workout)
+        )
+        if defer_indexes:
+            drop_indexes(conn)
+            conn.commit()
+        # Загрузку можно повторить с нуля, поэтому на её время отключаем fsync
+        synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+        conn.exec_driver_sql("PRAGMA synchronous = OFF")
+
+        writer = _BulkWriter(conn, {
+            "users": ["id", "name", "email", "password_hash", "experience_level", "goal", "created_at",
+                      "token_epoch"],
+            "exercises": ["id", "name", "description", "calories_per_minute", "exercise_type", "created_at"],
+            "workouts": ["id", "name", "description", "duration_minutes", "workout_type", "user_id", "created_at",
+                         "version", "updated_at"],
+            "workout_exercises": ["workout_id", "exercise_id"],
+            "user_stats": ["user_id", "total_workouts", "total_minutes", "total_calories",
+                           *(f"{workout_type.value}_workouts" for workout_type in WorkoutType),
+                           "last_workout_at", "workouts_version"],
+        }, batch_size, on_progress)
+
+        calories_per_minute = []
+        created_at = _timestamp(SEED_START)
+        for offset in range(exercises):
+            exercise_type = rng.choices(exercise_type_values, cum_weights=exercise_type_weights)[0]
+            base = rng.choice(EXERCISE_NAMES[exercise_type])
+            calories = rng.randint(*CALORIES_PER_MINUTE[exercise_type])
+            calories_per_minute.append(calories)
+            writer.add("exercises", (first_exercise + offset, f"{rng.choice(EXERCISE_MODIFIERS)} {base}",
+                                     f"{base.lower()}, {exercise_type.value}", calories, exercise_type.value,
+                                     created_at))
+            writer.flush_if_full()
+
+        password_hash = _password_hash(rng)
+        experience_levels, goals = list(UserExperience), list(UserGoal)
+        workout_id = first_workout
+        for offset in range(users):
+            user_id = first_user + offset
+            writer.add("users", (
+                user_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"user{user_id}@seed.example",
+                password_hash, rng.choice(experience_levels).value, rng.choice(goals).value,
+                _timestamp(SEED_START + timedelta(seconds=offset)), 0
+            ))
+
+            totals = {"minutes": 0, "calories": 0, "last": None}
+            by_type = dict.fromkeys(WorkoutType, 0)
+            count = workouts_count(rng)
+            for _ in range(count):
+                workout_type = rng.choices(workout_type_values, cum_weights=workout_type_weights)[0]
+                minutes = rng.randint(*DURATION_MINUTES[workout_type])
+                created_at = _timestamp(SEED_START + timedelta(seconds=rng.randrange(SEED_DAYS * 86400)))
+                writer.add("workouts", (workout_id, rng.choice(WORKOUT_NAMES[workout_type]), None, minutes,
+                                        workout_type.value, user_id, created_at, 1, created_at))
+
+                linked = rng.sample(range(exercises), min(links_count(rng), exercises)) if exercises else []
+                for index in linked:
+                    writer.add("workout_exercises", (workout_id, first_exercise + index))
+
+                totals["minutes"] += minutes
+                totals["calories"] += minutes * sum(calories_per_minute[index] for index in linked)
+                totals["last"] = max(totals["last"] or created_at, created_at)
+                by_type[workout_type] += 1
+                workout_id += 1
+
+            # Сводка считается на лету: пересчёт GROUP BY по десяткам миллионов связей дольше самой загрузки
+            if count:
+                writer.add("user_stats", (user_id, count, totals["minutes"], totals["calories"],
+                                          *(by_type[workout_type] for workout_type in WorkoutType),
+                                          totals["last"], 1))
+            writer.flush_if_full()
+        writer.flush()
+
+        if defer_indexes:
+            create_indexes(conn)
+            conn.commit()
+        conn.exec_driver_sql(f"PRAGMA synchronous = {synchronous}")
+
+    return {**writer.counts, "seconds": round(time.perf_counter() - started, 1)}
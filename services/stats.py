@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.associations import workout_exercises
+from models.exercises import Exercise
+from models.workouts import Workout
+from schemas.workouts import StatsBucket
+
+
+def workout_calories_per_minute():
+    """Коррелированный подзапрос: сумма calories_per_minute упражнений тренировки (по ключу workout_exercises)."""
+    return (
+        select(func.coalesce(func.sum(Exercise.calories_per_minute), 0))
+        .select_from(workout_exercises)
+        .join(Exercise, Exercise.id == workout_exercises.c.exercise_id)
+        .where(workout_exercises.c.workout_id == Workout.id)
+        .scalar_subquery()
+    )
+
+
+def bucket_expression(bucket: StatsBucket):
+    if bucket == StatsBucket.day:
+        return func.date(Workout.created_at)
+    if bucket == StatsBucket.week:
+        # Назад на 6 дней и вперёд до ближайшего понедельника — понедельник той же недели
+        return func.date(Workout.created_at, "-6 days", "weekday 1")
+    return func.date(Workout.created_at, "start of month")
+
+
+def _empty_period(period=None):
+    return {"period": period, "workouts": 0, "total_minutes": 0, "calories": 0, "by_type": {}}
+
+
+async def workout_stats(db: AsyncSession, user_id: int, bucket: StatsBucket,
+                        date_from: date | None = None, date_to: date | None = None) -> dict:
+    """
+    Считает число тренировок, минуты и калории по периодам одним агрегирующим запросом.
+    Калории тренировки — duration_minutes × сумма calories_per_minute её упражнений.
+    """
+    calories_per_minute = workout_calories_per_minute()
+    period = bucket_expression(bucket).label("period")
+    query = (
+        select(
+            period,
+            Workout.workout_type,
+            func.count(),
+            func.sum(Workout.duration_minutes),
+            func.sum(Workout.duration_minutes * calories_per_minute),
+        )
+        .where(Workout.user_id == user_id)
+        .group_by(period, Workout.workout_type)
+        .order_by(period)
+    )
+    if date_from:
+        query = query.where(Workout.created_at >= date_from)
+    if date_to:
+        query = query.where(Workout.created_at < date_to + timedelta(days=1))
+
+    totals = _empty_period()
+    periods = {}
+    for period_start, workout_type, count, minutes, calories in await db.execute(query):
+        for summary in (totals, periods.setdefault(period_start, _empty_period(period_start))):
+            summary["workouts"] += count
+            summary["total_minutes"] += minutes or 0
+            summary["calories"] += calories or 0
+            summary["by_type"][workout_type] = summary["by_type"].get(workout_type, 0) + count
+
+    return {"bucket": bucket, "totals": totals, "periods": list(periods.values())}
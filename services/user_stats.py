@@ -0,0 +1,148 @@
+from sqlalchemy import case, func, select, true, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.associations import workout_exercises
+from models.user_stats import UserStats
+from models.workouts import Workout
+from schemas.workouts import WorkoutType
+from services.stats import workout_calories_per_minute
+
+COUNTER_COLUMNS = ["total_workouts", "total_minutes", "total_calories"] + [
+    f"{workout_type.value}_workouts" for workout_type in WorkoutType
+]
+
+
+def _last_workout_at(user_id: int):
+    # max по индексу (user_id, created_at, id) — одно обращение к концу диапазона
+    return select(func.max(Workout.created_at)).where(Workout.user_id == user_id).scalar_subquery()
+
+
+async def apply_delta(db: AsyncSession, user_id: int, workouts: int = 0, minutes: int = 0, calories: int = 0,
+                      by_type: dict | None = None):
+    """
+    Прибавляет приращения к сводке пользователя одним UPSERT в текущей транзакции.
+    Вызывается после flush изменений в workouts, чтобы last_workout_at учёл их.
+    """
+    values = {"total_workouts": workouts, "total_minutes": minutes, "total_calories": calories}
+    for workout_type in WorkoutType:
+        values[f"{workout_type.value}_workouts"] = 0
+    for workout_type, count in (by_type or {}).items():
+        values[f"{WorkoutType(workout_type).value}_workouts"] += count
+
+    statement = sqlite_insert(UserStats).values(user_id=user_id, last_workout_at=_last_workout_at(user_id),
+                                                workouts_version=1, **values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            **{column: getattr(UserStats, column) + statement.excluded[column] for column in COUNTER_COLUMNS},
+            "last_workout_at": statement.excluded.last_workout_at,
+            "workouts_version": UserStats.workouts_version + 1,
+        }
+    )
+    await db.execute(statement)
+
+
+async def shift_exercise_calories(db: AsyncSession, exercise_id: int, calories_per_minute_diff: int):
+    """
+    Упражнение общее для тренировок разных пользователей: при смене calories_per_minute
+    калории каждого затронутого пользователя меняются на diff × сумму длительностей его тренировок с ним.
+    """
+    if not calories_per_minute_diff:
+        return
+    linked_minutes = (
+        select(func.sum(Workout.duration_minutes))
+        .join(workout_exercises, workout_exercises.c.workout_id == Workout.id)
+        .where(workout_exercises.c.exercise_id == exercise_id, Workout.user_id == UserStats.user_id)
+        .scalar_subquery()
+    )
+    affected_users = (
+        select(Workout.user_id)
+        .join(workout_exercises, workout_exercises.c.workout_id == Workout.id)
+        .where(workout_exercises.c.exercise_id == exercise_id)
+    )
+    await db.execute(
+        update(UserStats)
+        .where(UserStats.user_id.in_(affected_users))
+        .values(total_calories=UserStats.total_calories + calories_per_minute_diff * linked_minutes)
+    )
+
+
+async def bump_workouts_version(db: AsyncSession, user_ids):
+    """Меняет ETag списка тренировок пользователей user_ids (список или подзапрос)."""
+    await db.execute(
+        update(UserStats).where(UserStats.user_id.in_(user_ids)).values(workouts_version=UserStats.workouts_version + 1)
+    )
+
+
+async def get_workouts_version(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(UserStats.workouts_version).where(UserStats.user_id == user_id))
+    return result.scalar() or 0
+
+
+async def get_user_stats(db: AsyncSession, user_id: int) -> dict:
+    stats = await db.get(UserStats, user_id)
+    return (stats or UserStats(**{column: 0 for column in COUNTER_COLUMNS})).to_dict()
+
+
+def recomputed_stats_query():
+    """Сводка всех пользователей, пересчитанная с нуля по workouts ⋈ workout_exercises ⋈ exercises."""
+    return (
+        select(
+            Workout.user_id.label("user_id"),
+            func.count().label("total_workouts"),
+            func.sum(Workout.duration_minutes).label("total_minutes"),
+            func.sum(Workout.duration_minutes * workout_calories_per_minute()).label("total_calories"),
+            *[
+                func.sum(case((Workout.workout_type == workout_type.value, 1), else_=0))
+                .label(f"{workout_type.value}_workouts")
+                for workout_type in WorkoutType
+            ],
+            func.max(Workout.created_at).label("last_workout_at"),
+        )
+        .group_by(Workout.user_id)
+    )
+
+
+async def rebuild_user_stats(db: AsyncSession):
+    """
+    Пересобирает user_stats целиком одной транзакцией. Строки не удаляются, а перезаписываются:
+    workouts_version только растёт, иначе после пересборки ETag списков могли бы повториться.
+    """
+    query = recomputed_stats_query().subquery()
+    await db.execute(
+        update(UserStats).values(last_workout_at=None, workouts_version=UserStats.workouts_version + 1,
+                                 **{column: 0 for column in COUNTER_COLUMNS})
+    )
+    statement = sqlite_insert(UserStats).from_select(["user_id", *COUNTER_COLUMNS, "last_workout_at"], select(
+        query.c.user_id, *[query.c[column] for column in COUNTER_COLUMNS], query.c.last_workout_at
+    ).where(true()))  # WHERE обязателен: без него SQLite не отличает ON CONFLICT от ON соединения
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={column: statement.excluded[column] for column in [*COUNTER_COLUMNS, "last_workout_at"]}
+    )
+    await db.execute(statement)
+    await db.commit()
+
+
+async def verify_user_stats(db: AsyncSession) -> list[dict]:
+    """Сравнивает user_stats с пересчётом и возвращает расхождения по пользователям."""
+    expected = {row.user_id: row._asdict() for row in await db.execute(recomputed_stats_query())}
+    stored = {
+        stats.user_id: {"user_id": stats.user_id, "last_workout_at": stats.last_workout_at,
+                        **{column: getattr(stats, column) for column in COUNTER_COLUMNS}}
+        for stats in (await db.execute(select(UserStats))).scalars()
+    }
+    empty = {"last_workout_at": None, **{column: 0 for column in COUNTER_COLUMNS}}
+
+    drift = []
+    for user_id in sorted(expected.keys() | stored.keys()):
+        want = expected.get(user_id, {"user_id": user_id, **empty})
+        have = stored.get(user_id, {"user_id": user_id, **empty})
+        differences = {
+            column: {"stored": have[column], "expected": want[column]}
+            for column in [*COUNTER_COLUMNS, "last_workout_at"] if have[column] != want[column]
+        }
+        if differences:
+            drift.append({"user_id": user_id, "differences": differences})
+    return drift
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import USER_PURGE_CHUNK_SIZE, USER_PURGE_PAUSE_SECONDS
+from models.associations import workout_exercises
+from models.user_stats import UserStats
+from models.users import User
+from models.workouts import Workout
+
+logger = logging.getLogger(__name__)
+
+
+async def count_workouts(db: AsyncSession, user_id: int) -> int:
+    # Подсчёт по индексу (user_id, created_at, id), без чтения самих строк
+    return (await db.execute(select(func.count()).where(Workout.user_id == user_id))).scalar()
+
+
+async def delete_workouts(db: AsyncSession, *criteria) -> int:
+    """Удаляет тренировки, отобранные criteria, вместе со связями с упражнениями; возвращает число тренировок."""
+    await db.execute(delete(workout_exercises).where(
+        workout_exercises.c.workout_id.in_(select(Workout.id).where(*criteria))))
+    return (await db.execute(delete(Workout).where(*criteria))).rowcount
+
+
+async def delete_user_row(db: AsyncSession, user_id: int):
+    """Удаляет сводку и саму строку пользователя; его токены перестают приниматься после commit."""
+    await db.execute(delete(UserStats).where(UserStats.user_id == user_id))
+    await db.execute(delete(User).where(User.id == user_id))
+
+
+async def delete_user_with_workouts(db: AsyncSession, user_id: int) -> int:
+    """
+    Удаляет пользователя набором DELETE, не загружая объекты: связи тренировок с упражнениями → тренировки →
+    user_stats → users. Упражнения общие и не удаляются. Транзакцией управляет вызывающий код.
+    """
+    deleted = await delete_workouts(db, Workout.user_id == user_id)
+    await delete_user_row(db, user_id)
+    return deleted
+
+
+async def purge_workouts(session_factory, user_id: int, chunk_size: int = USER_PURGE_CHUNK_SIZE,
+                         on_progress=None) -> int:
+    """
+    Фоновая очистка тренировок пользователя, строка которого уже удалена: пачками по chunk_size тренировок,
+    каждая пачка — отдельная короткая транзакция, поэтому блокировка записи SQLite не держится долго.
+    on_progress(deleted, total) вызывается после каждой пачки. Прерванная очистка продолжается повторным вызовом.
+    """
+    deleted = 0
+    async with session_factory() as db:
+        total = await count_workouts(db, user_id)
+        while True:
+            workout_ids = (await db.execute(
+                select(Workout.id).where(Workout.user_id == user_id).limit(chunk_size))).scalars().all()
+            if not workout_ids:
+                break
+            deleted += await delete_workouts(db, Workout.id.in_(workout_ids))
+            await db.commit()
+            logger.info("Purged %s of %s workouts of user %s", deleted, total, user_id)
+            if on_progress:
+                on_progress(deleted, total)
+            await asyncio.sleep(USER_PURGE_PAUSE_SECONDS)
+    return deleted
+
+
+async def orphaned_workout_owners(db: AsyncSession) -> list[int]:
+    """id удалённых пользователей, у которых остались тренировки (например, очистку прервал перезапуск)."""
+    result = await db.execute(
+        select(Workout.user_id).distinct().where(Workout.user_id.not_in(select(User.id))).order_by(Workout.user_id))
+    return result.scalars().all()
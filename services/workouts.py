@@ -0,0 +1,89 @@
+import hashlib
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.pagination import decode_cursor, encode_cursor
+from models.associations import workout_exercises
+from models.exercises import Exercise
+from models.workouts import Workout
+from schemas.workouts import WorkoutBulkItem
+from services.user_stats import apply_delta, bump_workouts_version
+
+
+def workout_etag(workout: Workout) -> str:
+    updated_at = int(workout.updated_at.timestamp() * 1_000_000) if workout.updated_at else 0
+    # updated_at отличает новую тренировку, получившую id удалённой, от старой с той же версией
+    return f'"{workout.id}.{workout.version}.{updated_at}"'
+
+
+def workout_list_etag(user_id: int, workouts_version: int, cursor: str | None, limit: int) -> str:
+    """ETag страницы списка: свой у каждой пары (cursor, limit), иначе ETag одной страницы подтвердил бы другую."""
+    # Курсор нормализуется (и проверяется) разбором: одинаковые ключи в разной записи дают один ETag
+    page = encode_cursor(*decode_cursor(cursor)) if cursor else ""
+    digest = hashlib.sha1(f"{page}:{limit}".encode()).hexdigest()[:16]
+    return f'"u{user_id}.{workouts_version}.{digest}"'
+
+
+async def touch_workouts(db: AsyncSession, *criteria):
+    """Увеличивает version и обновляет updated_at тренировок, отобранных criteria, — меняет их ETag."""
+    await db.execute(
+        update(Workout).where(*criteria).values(version=Workout.version + 1, updated_at=datetime.now())
+    )
+
+
+async def touch_exercise_workouts(db: AsyncSession, exercise_id: int):
+    """Упражнение входит в ответы всех связанных тренировок: меняет их ETag и ETag списков их владельцев."""
+    linked_workouts = select(workout_exercises.c.workout_id).where(workout_exercises.c.exercise_id == exercise_id)
+    await touch_workouts(db, Workout.id.in_(linked_workouts))
+    await bump_workouts_version(db, select(Workout.user_id).where(Workout.id.in_(linked_workouts)))
+
+
+async def insert_many(db: AsyncSession, model, rows: list[dict]) -> list[int]:
+    """
+    Вставляет строки одним executemany и возвращает их id в порядке rows.
+    Пока транзакция держит блокировку записи, SQLite выдаёт rowid подряд (max(rowid) + 1),
+    поэтому id вставленных строк — это последние len(rows) значений до last_insert_rowid().
+    INSERT ... RETURNING с сохранением порядка на SQLite выполняется построчно.
+    """
+    if not rows:
+        return []
+    await db.execute(insert(model), rows)
+    last_id = (await db.execute(select(func.last_insert_rowid()))).scalar()
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+async def insert_workouts(db: AsyncSession, user_id: int, items: list[WorkoutBulkItem]) -> list[int]:
+    """
+    Вставляет тренировки вместе с вложенными упражнениями пакетно: по одному executemany
+    на workouts, exercises и workout_exercises, и обновляет сводку user_stats.
+    Возвращает id тренировок в порядке items. Транзакцией управляет вызывающий код.
+    """
+    if not items:
+        return []
+
+    workout_ids = await insert_many(
+        db, Workout, [{**item.model_dump(exclude={"exercises"}), "user_id": user_id} for item in items]
+    )
+
+    exercise_ids = await insert_many(
+        db, Exercise, [exercise.model_dump() for item in items for exercise in item.exercises]
+    )
+    exercise_ids = iter(exercise_ids)
+    link_rows = [
+        {"workout_id": workout_id, "exercise_id": next(exercise_ids)}
+        for workout_id, item in zip(workout_ids, items) for _ in item.exercises
+    ]
+    if link_rows:
+        await db.execute(insert(workout_exercises), link_rows)
+
+    await apply_delta(
+        db, user_id,
+        workouts=len(items),
+        minutes=sum(item.duration_minutes for item in items),
+        calories=sum(item.duration_minutes * sum(e.calories_per_minute for e in item.exercises) for item in items),
+        by_type=Counter(item.workout_type for item in items)
+    )
+    return workout_ids
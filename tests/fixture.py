@@ -1,43 +1,60 @@
 import os
+import re
 import sys
+from contextlib import contextmanager
 
 import faker
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Импортируем из проекта
 from main import app
-from core.database import get_db, Base
+from core.database import (get_db, get_session_factory, Base, apply_sqlite_profile, instrument_engine,
+                           read_session_factory, session_router)
+from core.hashing import password_context
+from core.security import clear_auth_caches
+from services.exercises import exercise_cache
 from schemas.users import UserExperience, UserGoal
-from core.config import SQLALCHEMY_TEST_DATABASE_URL
+from core.config import (SQLALCHEMY_TEST_DATABASE_URL, SQLALCHEMY_TEST_ASYNC_DATABASE_URL,
+                         SQLALCHEMY_TEST_READ_DATABASE_URL)
 
 engine = create_engine(
     SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(SQLALCHEMY_TEST_ASYNC_DATABASE_URL)
+apply_sqlite_profile(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+TestingSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+read_engine = create_async_engine(SQLALCHEMY_TEST_READ_DATABASE_URL)
+apply_sqlite_profile(read_engine.sync_engine, read_only=True)
+instrument_engine(read_engine.sync_engine, "read")
+TestingReadSessionLocal = read_session_factory(async_engine, read_engine)
+override_get_db, override_get_session_factory = session_router(TestingSessionLocal, TestingReadSessionLocal)
 
 fake = faker.Faker()
 
+# Минимальная стоимость bcrypt: тестам нужна логика хэширования, а не его стойкость
+password_context.default.rounds = 4
+
 
 # Создаём таблицы перед тестами
 @pytest.fixture(scope="module", autouse=True)
 def setup_test_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # id в новой БД начинаются заново, закэшированные эпохи токенов и упражнения к ним не относятся
+    clear_auth_caches()
+    exercise_cache.clear()
 
-    # Подменяем зависимость get_db
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-
+    # Подменяем зависимости get_db и get_session_factory
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -64,3 +81,92 @@ def registered_user(client):
 
     payload["token"] = response.headers["authorization"]
     return payload
+
+
+# Движки, через которые обработчики выполняют SQL: запись и чтение
+APP_ENGINES = (async_engine.sync_engine, read_engine.sync_engine)
+
+
+@contextmanager
+def listen_statements(callback):
+    for sync_engine in APP_ENGINES:
+        event.listen(sync_engine, "before_cursor_execute", callback)
+    try:
+        yield
+    finally:
+        for sync_engine in APP_ENGINES:
+            event.remove(sync_engine, "before_cursor_execute", callback)
+
+
+# Список SQL-запросов, выполненных через тестовые движки
+@pytest.fixture
+def sql_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with listen_statements(before_cursor_execute):
+        yield statements
+
+
+# Таблицы, которые при выполнении запросов обработчиков не должны читаться полным сканированием
+INDEXED_TABLES = {"workouts", "users", "exercises", "workout_exercises"}
+_SCAN = re.compile(r"^SCAN (\w+?)(?:_\d+)?(?: AS \w+)?$")
+_NOT_PLANNED = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class QueryRecorder:
+    """Записывает SQL, выполненный через тестовые движки, и проверяет планы запросов через EXPLAIN QUERY PLAN."""
+
+    def __init__(self):
+        self.statements = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Для executemany план один и тот же, достаточно первого набора параметров
+        self.statements.append((statement, parameters[0] if executemany and parameters else parameters))
+
+    def plan(self, statement: str, parameters) -> list[str]:
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        finally:
+            connection.close()
+        return [row[3] for row in rows]
+
+    def full_scans(self, allow_scans=()) -> list[tuple[str, str]]:
+        """Пары (таблица, запрос) для полных сканирований таблиц из INDEXED_TABLES, кроме разрешённых."""
+        scans = []
+        for statement, parameters in self.statements:
+            if statement.lstrip().upper().startswith(_NOT_PLANNED):
+                continue
+            for detail in self.plan(statement, parameters):
+                match = _SCAN.match(detail)
+                if match and match.group(1) in INDEXED_TABLES - set(allow_scans):
+                    scans.append((match.group(1), statement))
+        return scans
+
+    @contextmanager
+    def budget(self, max_statements: int, allow_scans=()):
+        """
+        Проверяет блок с запросами к приложению: не больше max_statements SQL-запросов и ни одного полного
+        сканирования. Кэши сбрасываются, поэтому бюджет — это число запросов при холодном кэше.
+        """
+        clear_auth_caches()
+        exercise_cache.clear()
+        self.statements.clear()
+        yield self
+        assert len(self.statements) <= max_statements, (
+            f"{len(self.statements)} SQL statements, budget {max_statements}:\n"
+            + "\n".join(statement for statement, _ in self.statements)
+        )
+        scans = self.full_scans(allow_scans)
+        assert not scans, "Full table scans:\n" + "\n".join(f"{table}: {statement}" for table, statement in scans)
+
+
+@pytest.fixture
+def query_recorder():
+    recorder = QueryRecorder()
+    with listen_statements(recorder.before_cursor_execute):
+        yield recorder
@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from fixture import setup_test_db
+from core.admission import AdmissionControlMiddleware, AdmissionLimiter, build_limiters
+
+
+def blocking_app(release: asyncio.Event):
+    app = FastAPI()
+
+    @app.get("/auth/login")
+    async def login():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/workouts")
+    async def workouts():
+        return {"ok": True}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {"ok": True}
+
+    return app
+
+
+def test_auth_budget_is_separate():
+    async def run():
+        release = asyncio.Event()
+        limiters = build_limiters([("/auth/login", 1, 1, 5.0), ("/", 10, 10, 1.0)])
+        app = AdmissionControlMiddleware(blocking_app(release), limiters)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            admitted = asyncio.create_task(client.get("/auth/login"))
+            queued = asyncio.create_task(client.get("/auth/login"))
+            await asyncio.sleep(0.05)
+
+            # Слот и очередь входа заняты: третий запрос сразу получает 503
+            response = await client.get("/auth/login")
+            assert response.status_code == 503
+            assert int(response.headers["Retry-After"]) >= 1
+
+            # Остальные ручки живут по своему лимиту
+            assert (await client.get("/workouts")).status_code == 200
+
+            release.set()
+            assert (await admitted).status_code == 200
+            assert (await queued).status_code == 200
+
+        login_stats = limiters[0][1].stats()
+        assert login_stats["admitted"] == 2
+        assert login_stats["rejected"] == 1
+        assert login_stats["active"] == 0
+
+    asyncio.run(run())
+
+
+def test_limiter_rejects_by_deadline():
+    async def run():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=10, max_wait=0.05)
+        assert await limiter.acquire()
+
+        # Ожидание дольше max_wait — отказ по таймауту, очередь освобождается
+        assert not await limiter.acquire()
+        assert limiter.stats()["timed_out"] == 1
+        assert limiter.stats()["waiting"] == 0
+
+        # По оценке среднего времени обработки очередь не успеет продвинуться — отказ без ожидания
+        limiter.release(1.0)
+        assert await limiter.acquire()
+        started = asyncio.get_running_loop().time()
+        assert not await limiter.acquire()
+        assert asyncio.get_running_loop().time() - started < 0.01
+
+        # Освобождённый слот передаётся ожидающему
+        limiter.avg_service_seconds = 0.0
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release(0.0)
+        assert await waiting
+        assert limiter.active == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_released_before_resume():
+    async def run():
+        limiter = AdmissionLimiter("test", max_concurrent=1, max_queue=10, max_wait=5.0)
+        assert await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # Ожидание отменено, и до возобновления ожидающего release() уже снял его из очереди
+        waiting.cancel()
+        await asyncio.sleep(0)
+        limiter.release(0.0)
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        assert limiter.stats()["waiting"] == 0
+        assert limiter.active == 0
+        assert await limiter.acquire()
+
+    asyncio.run(run())
+
+
+def test_metrics_bypass_saturated_limiter():
+    async def run():
+        release = asyncio.Event()
+        limiters = build_limiters([("/", 1, 0, 1.0)])
+        app = AdmissionControlMiddleware(blocking_app(release), limiters)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            busy = asyncio.create_task(client.get("/auth/login"))
+            await asyncio.sleep(0.05)
+            assert (await client.get("/workouts")).status_code == 503
+            assert (await client.get("/metrics")).status_code == 200
+            release.set()
+            assert (await busy).status_code == 200
+
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from fixture import setup_test_db, registered_user, client, engine, fake
+from core.hashing import HashingExecutor
+from models.users import User
+
+
+def stored_hash(email: str) -> str:
+    with engine.connect() as conn:
+        return conn.execute(select(User.password_hash).where(User.email == email)).scalar()
+
+
+def test_login_with_bcrypt_hash(client: TestClient, registered_user):
+    assert stored_hash(registered_user["email"]).startswith("$2b$")
+
+    response = client.post("/auth/login", params={"email": registered_user["email"],
+                                                  "password": registered_user["password"]})
+    assert response.status_code == 200
+    assert response.json()["access_token"].startswith("Bearer ")
+
+    response = client.post("/auth/login", params={"email": registered_user["email"], "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_legacy_hash_is_upgraded_on_login(client: TestClient):
+    email, password = fake.email(), fake.password()
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(name="Legacy", email=email, experience_level="beginner", goal="endurance",
+                                         password_hash=hashlib.sha256(password.encode()).hexdigest()))
+
+    # Неверный пароль не меняет хэш
+    assert client.post("/auth/login", params={"email": email, "password": "wrong"}).status_code == 401
+    assert len(stored_hash(email)) == 64
+
+    assert client.post("/auth/login", params={"email": email, "password": password}).status_code == 200
+    assert stored_hash(email).startswith("$2b$")
+    assert client.post("/auth/login", params={"email": email, "password": password}).status_code == 200
+
+
+def test_hashing_stats(client: TestClient, registered_user):
+    response = client.get("/auth/hashing-stats", headers={"Authorization": registered_user["token"]})
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["completed"] >= 1
+    assert stats["queue_depth"] == 0
+
+
+def test_hashing_executor_rejects_when_full():
+    executor = HashingExecutor(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queue_depth"] == 1
+        with pytest.raises(HTTPException) as error:
+            await executor.run(release.wait)
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"] == "1"
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(run())
+    stats = executor.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
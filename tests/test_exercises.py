@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 
-from fixture import registered_user, client
+from fixture import setup_test_db, registered_user, client, sql_statements
+from services.exercises import exercise_cache
 from schemas.exercises import ExerciseType
 from schemas.workouts import WorkoutType
 
@@ -136,3 +137,154 @@ def test_delete_exercise_from_workout(client: TestClient, registered_user):
     # Проверяем, что его больше нет
     get_response = client.get(f"/workouts/{workout_id}/exercises/{exercise_id}", headers=headers)
     assert get_response.status_code == 404
+
+
+def test_add_exercises_to_workout(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": registered_user["token"]}
+
+    source_id = create_test_workout(client, headers)
+    exercise_ids = [add_exercise_to_workout(client, headers, source_id) for _ in range(3)]
+    workout_id = create_test_workout(client, headers)
+
+    # Первое упражнение привязываем по старому параметру exercise_id
+    response = client.post(f"/workouts/{workout_id}/add-exercise", params={"exercise_id": exercise_ids[0]},
+                           headers=headers)
+    assert response.status_code == 200
+    assert response.json()["added"] == [exercise_ids[0]]
+
+    sql_statements.clear()
+    response = client.post(f"/workouts/{workout_id}/add-exercise", params={"exercise_ids": exercise_ids},
+                           headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["added"] == exercise_ids[1:]
+    assert data["already_linked"] == [exercise_ids[0]]
+    # Вставка всех связей — один INSERT
+    assert sum(statement.startswith("INSERT INTO workout_exercises") for statement in sql_statements) == 1
+
+    workout = client.get(f"/workouts/{workout_id}", headers=headers).json()
+    assert sorted(e["id"] for e in workout["exercises"]) == sorted(exercise_ids)
+
+    response = client.post(f"/workouts/{workout_id}/add-exercise", params={"exercise_ids": exercise_ids},
+                           headers=headers)
+    assert response.status_code == 400
+
+    response = client.post(f"/workouts/{workout_id}/add-exercise", params={"exercise_ids": [10 ** 9]},
+                           headers=headers)
+    assert response.status_code == 404
+
+
+def test_search_exercises(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+
+    workout_id = client.post("/workouts", json={"name": "Search", "duration_minutes": 30,
+                                                "workout_type": WorkoutType.strength}, headers=headers).json()["id"]
+    payloads = [
+        {"name": "Kettlebell swing", "description": "Hip hinge", "calories_per_minute": 12,
+         "exercise_type": ExerciseType.strength},
+        {"name": "Goblet squat", "description": "Squat holding a kettlebell", "calories_per_minute": 8,
+         "exercise_type": ExerciseType.strength},
+        {"name": "Kettlebell flow", "description": None, "calories_per_minute": 15,
+         "exercise_type": ExerciseType.cardio},
+    ]
+    ids = [client.post(f"/workouts/{workout_id}/exercises", json=payload, headers=headers).json()["id"]
+           for payload in payloads]
+
+    # Префиксный поиск; совпадение в названии ранжируется выше совпадения в описании
+    response = client.get("/exercises/search", params={"q": "kettle"}, headers=headers)
+    assert response.status_code == 200
+    found = [e["id"] for e in response.json()]
+    assert set(found) == set(ids)
+    assert found[-1] == ids[1]
+
+    response = client.get("/exercises/search", params={"q": "kettle", "exercise_type": "strength",
+                                                       "min_calories_per_minute": 10}, headers=headers)
+    assert [e["id"] for e in response.json()] == [ids[0]]
+    assert response.headers["X-Search-Truncated"] == "false"
+
+    # Изменение названия попадает в индекс
+    client.put(f"/workouts/{workout_id}/exercises/{ids[2]}", json={
+        "name": "Rowing intervals", "calories_per_minute": 15, "exercise_type": ExerciseType.cardio}, headers=headers)
+    assert ids[2] not in [e["id"] for e in client.get("/exercises/search", params={"q": "kettle"},
+                                                      headers=headers).json()]
+    assert [e["id"] for e in client.get("/exercises/search", params={"q": "row int"}, headers=headers).json()] \
+        == [ids[2]]
+
+    # Операторы FTS5 во вводе не ломают запрос
+    response = client.get("/exercises/search", params={"q": '"swing" (* -'}, headers=headers)
+    assert response.status_code == 200
+    assert [e["id"] for e in response.json()] == [ids[0]]
+
+    response = client.get("/exercises/search", params={"q": "kettle", "min_calories_per_minute": 10,
+                                                       "max_calories_per_minute": 5}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_exercise_cache(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": registered_user["token"]}
+
+    workout_id = create_test_workout(client, headers)
+    exercise_ids = [add_exercise_to_workout(client, headers, workout_id) for _ in range(3)]
+
+    client.get(f"/workouts/{workout_id}", headers=headers)
+    stats_before = client.get("/exercises/cache-stats", headers=headers).json()
+
+    # Повторное чтение: из БД — только тренировка и связи с версиями упражнений, сами упражнения — из кэша
+    sql_statements.clear()
+    workout = client.get(f"/workouts/{workout_id}", headers=headers).json()
+    assert [e["id"] for e in workout["exercises"]] == exercise_ids
+    assert len(sql_statements) == 2
+    assert not any("exercises.name" in statement for statement in sql_statements)
+    stats = client.get("/exercises/cache-stats", headers=headers).json()
+    assert stats["hits"] == stats_before["hits"] + 3
+    assert stats["misses"] == stats_before["misses"]
+
+    # Изменение упражнения меняет его версию: из БД перечитывается только оно
+    client.put(f"/workouts/{workout_id}/exercises/{exercise_ids[0]}", json={
+        "name": "Renamed", "calories_per_minute": 7, "exercise_type": ExerciseType.cardio}, headers=headers)
+    sql_statements.clear()
+    workout = client.get(f"/workouts/{workout_id}", headers=headers).json()
+    assert workout["exercises"][0]["name"] == "Renamed"
+    assert sum("exercises.name" in statement for statement in sql_statements) == 1
+    assert client.get(f"/workouts/{workout_id}/exercises/{exercise_ids[0]}", headers=headers).json()["name"] \
+        == "Renamed"
+
+
+def test_exercise_cache_ignores_late_stale_entry(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    workout_id = create_test_workout(client, headers)
+    exercise_id = add_exercise_to_workout(client, headers, workout_id)
+    stale = client.get(f"/workouts/{workout_id}/exercises/{exercise_id}", headers=headers).json()
+
+    client.put(f"/workouts/{workout_id}/exercises/{exercise_id}", json={
+        "name": "Renamed", "calories_per_minute": 7, "exercise_type": ExerciseType.cardio}, headers=headers)
+    # Чтение, начавшееся до изменения, кладёт старую строку в кэш уже после коммита
+    exercise_cache.set((exercise_id, 1), stale)
+
+    assert client.get(f"/workouts/{workout_id}/exercises/{exercise_id}", headers=headers).json()["name"] == "Renamed"
+    assert client.get(f"/workouts/{workout_id}", headers=headers).json()["exercises"][0]["name"] == "Renamed"
+
+
+def test_search_ranks_all_matches_before_candidate_window(client: TestClient, registered_user, monkeypatch):
+    monkeypatch.setattr("services.search.SEARCH_MAX_CANDIDATES", 2)
+    headers = {"Authorization": registered_user["token"]}
+    workout_id = create_test_workout(client, headers)
+    payloads = [{"name": "Plank", "calories_per_minute": 3, "exercise_type": ExerciseType.flexibility}] + [
+        {"name": f"Side plank jacks {i}", "calories_per_minute": 10, "exercise_type": ExerciseType.cardio}
+        for i in range(3)]
+    ids = [client.post(f"/workouts/{workout_id}/exercises", json=payload, headers=headers).json()["id"]
+           for payload in payloads]
+
+    # Самое старое совпадение — лучшее по bm25 и попадает в окно из двух кандидатов раньше новых
+    response = client.get("/exercises/search", params={"q": "plank", "limit": 2}, headers=headers)
+    assert [e["id"] for e in response.json()][0] == ids[0]
+    assert response.headers["X-Search-Truncated"] == "false"
+
+    # Фильтр применяется к лучшим кандидатам: третье по релевантности упражнение за окном, о чём говорит заголовок
+    response = client.get("/exercises/search", params={"q": "plank", "exercise_type": "cardio"}, headers=headers)
+    assert len(response.json()) == 1
+    assert response.headers["X-Search-Truncated"] == "true"
+
+    response = client.get("/exercises/search", params={"q": "plank jacks 2"}, headers=headers)
+    assert [e["id"] for e in response.json()] == [ids[3]]
+    assert response.headers["X-Search-Truncated"] == "false"
@@ -0,0 +1,72 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from fixture import setup_test_db, registered_user, client
+from core.metrics import Histogram, REGISTRY
+from schemas.workouts import WorkoutType
+
+
+def sample(text: str, name: str, default=None, **labels) -> float:
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{re.escape(name)}(?:\{{(.*)\}})? (\S+)", line)
+        if match:
+            found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(1) or ""))
+            if all(found.get(key) == str(value) for key, value in labels.items()):
+                return float(match.group(2))
+    if default is not None:
+        return default
+    raise AssertionError(f"{name} {labels} not found")
+
+
+def test_metrics_endpoint(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    route = "/workouts/{workout_id}"
+    # Метрики общие для процесса, поэтому сравниваются приращения
+    before = client.get("/metrics").text
+
+    def delta(text, name, **labels):
+        return sample(text, name, **labels) - sample(before, name, default=0, **labels)
+
+    workout_id = client.post("/workouts", json={"name": "Metered", "duration_minutes": 10,
+                                                "workout_type": WorkoutType.cardio}, headers=headers).json()["id"]
+    for _ in range(3):
+        assert client.get(f"/workouts/{workout_id}", headers=headers).status_code == 200
+    client.get("/workouts/999999", headers=headers)
+    client.get("/no-such-path")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    assert delta(text, "http_requests_total", method="GET", route=route, status="200") == 3
+    assert delta(text, "http_requests_total", method="GET", route=route, status="404") == 1
+    assert delta(text, "http_requests_total", method="GET", route="<unmatched>", status="404") == 1
+    assert delta(text, "http_request_duration_seconds_count", method="GET", route=route) == 4
+    assert delta(text, "http_request_duration_seconds_bucket", method="GET", route=route, le="+Inf") == 4
+    # Каждое чтение тренировки выполняет хотя бы один запрос к БД
+    assert delta(text, "http_request_sql_statements_bucket", route=route, le="0") == 0
+    assert delta(text, "http_request_sql_statements_sum", route=route) >= 4
+    # GET-запросы читают через движок чтения
+    assert delta(text, "db_statements_total", engine="read") >= 4
+    assert delta(text, "auth_get_current_user_seconds_count") == 5
+    assert sample(text, "db_pool_checked_out", engine="async") == 0
+    assert sample(text, "db_pool_checked_out", engine="read") == 0
+    # /metrics не проходит допуск и слот не занимает
+    assert sample(text, "admission_active_requests", rule="/") == 0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_histogram_seconds", "test", ("kind",), buckets=(0.1, 1.0))
+    try:
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "a")
+        text = histogram.render()
+    finally:
+        REGISTRY.remove(histogram)
+    assert sample(text, "test_histogram_seconds_bucket", kind="a", le="0.1") == 2
+    assert sample(text, "test_histogram_seconds_bucket", kind="a", le="1.0") == 3
+    assert sample(text, "test_histogram_seconds_bucket", kind="a", le="+Inf") == 4
+    assert sample(text, "test_histogram_seconds_count", kind="a") == 4
+    assert sample(text, "test_histogram_seconds_sum", kind="a") == 3.65
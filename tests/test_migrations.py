@@ -0,0 +1,140 @@
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from fixture import setup_test_db
+from core.database import Base
+from core.pagination import keyset_page, split_page
+from core.schema import (SCHEMA_REVISION, alembic_config, build_indexes, check_schema_version, head_revision,
+                         include_name, missing_indexes, schema_revision)
+from models.users import User
+from models.workouts import Workout
+
+
+def temp_engine(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    return url, create_engine(url)
+
+
+def test_baseline_matches_models(tmp_path):
+    url, engine = temp_engine(tmp_path)
+    assert not check_schema_version(engine)
+
+    command.upgrade(alembic_config(url), "head")
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": include_name})
+        assert compare_metadata(context, Base.metadata) == []
+        # Новая миграция должна сопровождаться сменой SCHEMA_REVISION, иначе старт не заметит отставания базы
+        assert schema_revision(conn) == head_revision() == SCHEMA_REVISION
+        assert "exercises_fts" in inspect(conn).get_table_names()
+    assert check_schema_version(engine)
+
+    command.downgrade(alembic_config(url), "base")
+    with engine.connect() as conn:
+        assert inspect(conn).get_table_names() == ["alembic_version"]
+    engine.dispose()
+
+
+# Схема, которую создавал create_all при старте до миграций (исходные модели, без колонок и индексов серии)
+LEGACY_SCHEMA = [
+    """CREATE TABLE users (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL,
+       password_hash VARCHAR(100) NOT NULL, experience_level VARCHAR(12) NOT NULL, goal VARCHAR(11) NOT NULL,
+       created_at DATETIME, PRIMARY KEY (id))""",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE exercises (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description VARCHAR(500),
+       calories_per_minute INTEGER NOT NULL, exercise_type VARCHAR(11) NOT NULL, created_at DATETIME,
+       PRIMARY KEY (id))""",
+    "CREATE INDEX ix_exercises_id ON exercises (id)",
+    """CREATE TABLE workouts (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description VARCHAR(500),
+       duration_minutes INTEGER NOT NULL, workout_type VARCHAR(11) NOT NULL, user_id INTEGER NOT NULL,
+       created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))""",
+    "CREATE INDEX ix_workouts_id ON workouts (id)",
+    """CREATE TABLE workout_exercises (workout_id INTEGER NOT NULL, exercise_id INTEGER NOT NULL,
+       PRIMARY KEY (workout_id, exercise_id), FOREIGN KEY(workout_id) REFERENCES workouts (id),
+       FOREIGN KEY(exercise_id) REFERENCES exercises (id))""",
+]
+
+
+def test_adopts_legacy_create_all_database(tmp_path):
+    url, engine = temp_engine(tmp_path)
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users (id, name, email, password_hash, experience_level, goal, created_at) "
+                          "VALUES (7, 'Old', 'old@example.com', 'x', 'beginner', 'endurance', '2024-01-01')"))
+        conn.execute(text("INSERT INTO exercises (name, calories_per_minute, exercise_type) "
+                          "VALUES ('Kettlebell swing', 9, 'cardio')"))
+        conn.execute(text("INSERT INTO workouts (name, duration_minutes, workout_type, user_id, created_at) "
+                          "VALUES ('Swings', 10, 'cardio', 7, '2024-02-01 10:00:00.000000'), "
+                          "('Rest', 20, 'flexibility', 7, '2024-02-02 10:00:00.000000')"))
+        conn.execute(text("INSERT INTO workout_exercises VALUES (1, 1)"))
+
+    command.upgrade(alembic_config(url), "head")
+    assert check_schema_version(engine)
+    with engine.begin() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": include_name})
+        assert compare_metadata(context, Base.metadata) == []
+        assert missing_indexes(conn) == []
+        users_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'users'")).scalar()
+        assert "AUTOINCREMENT" in users_sql
+        assert conn.execute(text("SELECT id, token_epoch FROM users")).all() == [(7, 0)]
+        assert conn.execute(text("SELECT version FROM workouts")).scalars().all() == [1, 1]
+        assert conn.execute(text(
+            "SELECT total_workouts, total_minutes, total_calories, cardio_workouts, flexibility_workouts, "
+            "last_workout_at FROM user_stats WHERE user_id = 7")).one() == (2, 30, 90, 1, 1,
+                                                                            "2024-02-02 10:00:00.000000")
+        assert conn.execute(text("SELECT rowid FROM exercises_fts WHERE exercises_fts MATCH 'swing'")).all() == [(1,)]
+        # id удалённого пользователя не достаётся новому
+        conn.execute(text("DELETE FROM users WHERE id = 7"))
+        conn.execute(text("INSERT INTO users (name, email, password_hash, experience_level, goal, created_at) "
+                          "VALUES ('New', 'new@example.com', 'x', 'beginner', 'endurance', '2024-03-01')"))
+        assert conn.execute(text("SELECT id FROM users")).scalar() == 8
+    engine.dispose()
+
+
+def test_rows_without_created_at_stay_reachable_by_cursor(tmp_path):
+    url, engine = temp_engine(tmp_path)
+    command.upgrade(alembic_config(url), "0003")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, name, email, password_hash, experience_level, goal) "
+                          "VALUES (1, 'Old', 'old@example.com', 'x', 'beginner', 'endurance')"))
+        conn.execute(text("INSERT INTO workouts (id, name, duration_minutes, workout_type, user_id, created_at) "
+                          "VALUES (1, 'A', 10, 'cardio', 1, '2024-02-02 10:00:00.000000'), "
+                          "(2, 'B', 10, 'cardio', 1, '2024-02-01 10:00:00.000000'), "
+                          "(3, 'C', 10, 'cardio', 1, NULL), (4, 'D', 10, 'cardio', 1, NULL)"))
+
+    command.upgrade(alembic_config(url), "head")
+    with Session(engine) as db:
+        # Бывшая NULL-строка 4 закрывает первую страницу: курсор строится по ней, и строка 3 не теряется
+        ids, cursor = [], None
+        while True:
+            page, cursor = split_page(db.execute(keyset_page(select(Workout), Workout, cursor, 3)).scalars().all(), 3)
+            ids += [workout.id for workout in page]
+            if cursor is None:
+                break
+        assert ids == [1, 2, 4, 3]
+        assert db.execute(select(User.created_at).where(User.id == 1)).scalar() is not None
+
+    with engine.begin() as conn, pytest.raises(IntegrityError):
+        conn.execute(text("INSERT INTO workouts (name, duration_minutes, workout_type, user_id) "
+                          "VALUES ('E', 10, 'cardio', 1)"))
+    engine.dispose()
+
+
+def test_build_indexes(tmp_path):
+    url, engine = temp_engine(tmp_path)
+    command.upgrade(alembic_config(url), "head")
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_workout_exercises_exercise_id_workout_id"))
+        assert [index.name for index in missing_indexes(conn)] == ["ix_workout_exercises_exercise_id_workout_id"]
+
+    progress = []
+    assert build_indexes(engine, on_progress=lambda name, seconds: progress.append(name)) == progress == [
+        "ix_workout_exercises_exercise_id_workout_id"]
+    assert build_indexes(engine) == []
+    engine.dispose()
@@ -0,0 +1,136 @@
+import json
+from typing import Callable, NamedTuple
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from fixture import setup_test_db, registered_user, client, query_recorder, fake
+from main import app
+from schemas.workouts import WorkoutType
+
+
+@pytest.fixture
+def data(client: TestClient, registered_user):
+    """Пользователь с несколькими тренировками по несколько упражнений: бюджеты не должны зависеть от их числа."""
+    headers = {"Authorization": registered_user["token"]}
+    response = client.post("/workouts/bulk", json=[
+        {"name": f"Workout {i}", "duration_minutes": 30, "workout_type": WorkoutType.strength,
+         "exercises": [{"name": f"Squat {i}-{j}", "calories_per_minute": 5, "exercise_type": "strength"}
+                       for j in range(3)]}
+        for i in range(5)
+    ], headers=headers)
+    workout_ids = response.json()["ids"]
+    workout = client.get(f"/workouts/{workout_ids[0]}", headers=headers).json()
+    return {"user": registered_user, "headers": headers, "workout_ids": workout_ids,
+            "exercise_ids": [e["id"] for e in workout["exercises"]]}
+
+
+class Budget(NamedTuple):
+    """Не больше statements SQL-запросов при холодных кэшах; request(client, data) — аргументы client.request."""
+    statements: int
+    request: Callable[[TestClient, dict], dict] = lambda client, data: {}
+    status_code: int = 200
+    allow_scans: tuple = ()
+
+
+def new_user(client: TestClient) -> dict:
+    payload = {"name": "Budget", "email": fake.email(), "password": "secret", "experience_level": "beginner",
+               "goal": "endurance"}
+    client.post("/auth/signup", json=payload)
+    return payload
+
+
+WORKOUT = {"name": "Budget", "duration_minutes": 20, "workout_type": WorkoutType.cardio}
+USER_FIELDS = ("name", "email", "password", "experience_level", "goal")
+
+
+def auth(data: dict, **kwargs) -> dict:
+    return {"headers": data["headers"], **kwargs}
+
+
+def workout_path(data: dict, index: int = 0, **params) -> dict:
+    return {"workout_id": data["workout_ids"][index], **params}
+
+
+# Бюджет каждого маршрута приложения: (метод, шаблон пути) -> Budget
+BUDGETS = {
+    ("POST", "/auth/signup"): Budget(3, lambda client, data: {"json": {
+        "name": "Budget", "email": fake.email(), "password": "secret", "experience_level": "beginner",
+        "goal": "endurance"}}, status_code=201),
+    ("POST", "/auth/login"): Budget(1, lambda client, data: {"params": {
+        "email": data["user"]["email"], "password": data["user"]["password"]}}),
+    ("GET", "/auth/hashing-stats"): Budget(1, lambda client, data: auth(data)),
+
+    ("GET", "/users/"): Budget(1),
+    ("GET", "/users/{user_email}"): Budget(2, lambda client, data: auth(
+        data, path_params={"user_email": data["user"]["email"]})),
+    ("PUT", "/users/{user_email}"): Budget(3, lambda client, data: {
+        "path_params": {"user_email": data["user"]["email"]},
+        "json": {field: data["user"][field] for field in USER_FIELDS}}),
+    ("DELETE", "/users/{user_email}"): Budget(6, lambda client, data: {
+        "path_params": {"user_email": new_user(client)["email"]}}, status_code=204),
+
+    ("GET", "/workouts/"): Budget(5, lambda client, data: auth(data)),
+    ("GET", "/workouts/{workout_id}"): Budget(4, lambda client, data: auth(data, path_params=workout_path(data))),
+    ("GET", "/workouts/stats"): Budget(2, lambda client, data: auth(data)),
+    ("GET", "/workouts/summary"): Budget(2, lambda client, data: auth(data)),
+    ("GET", "/workouts/export"): Budget(2, lambda client, data: auth(data)),
+    ("GET", "/workouts/{workout_id}/exercises"): Budget(4, lambda client, data: auth(
+        data, path_params=workout_path(data))),
+    ("GET", "/workouts/{workout_id}/exercises/{exercise_id}"): Budget(4, lambda client, data: auth(
+        data, path_params=workout_path(data, exercise_id=data["exercise_ids"][0]))),
+
+    ("POST", "/workouts/"): Budget(3, lambda client, data: auth(data, json=WORKOUT), status_code=201),
+    ("POST", "/workouts/bulk"): Budget(7, lambda client, data: auth(data, json=[{
+        **WORKOUT, "exercises": [{"name": "Run", "calories_per_minute": 9, "exercise_type": "cardio"}]}] * 20),
+        status_code=201),
+    ("POST", "/workouts/import"): Budget(4, lambda client, data: auth(
+        data, content="\n".join(json.dumps({**WORKOUT, "exercises": []}) for _ in range(20)))),
+    ("PUT", "/workouts/{workout_id}"): Budget(6, lambda client, data: auth(
+        data, path_params=workout_path(data, 1), json=WORKOUT)),
+    ("DELETE", "/workouts/{workout_id}"): Budget(6, lambda client, data: auth(
+        data, path_params=workout_path(data, 3)), status_code=204),
+    ("POST", "/workouts/{workout_id}/add-exercise"): Budget(7, lambda client, data: auth(
+        data, path_params=workout_path(data, 2), params={"exercise_ids": data["exercise_ids"]})),
+    ("POST", "/workouts/{workout_id}/exercises"): Budget(7, lambda client, data: auth(
+        data, path_params=workout_path(data, 2),
+        json={"name": "Lunge", "calories_per_minute": 6, "exercise_type": "strength"}), status_code=201),
+    ("PUT", "/workouts/{workout_id}/exercises/{exercise_id}"): Budget(7, lambda client, data: auth(
+        data, path_params=workout_path(data, exercise_id=data["exercise_ids"][0]),
+        json={"name": "Walking lunge", "calories_per_minute": 7, "exercise_type": "strength"})),
+    ("DELETE", "/workouts/{workout_id}/exercises/{exercise_id}"): Budget(6, lambda client, data: auth(
+        data, path_params=workout_path(data, exercise_id=data["exercise_ids"][0])), status_code=204),
+
+    ("GET", "/exercises/search"): Budget(2, lambda client, data: auth(data, params={"q": "squat"})),
+    ("GET", "/exercises/cache-stats"): Budget(1, lambda client, data: auth(data)),
+    ("GET", "/metrics"): Budget(0),
+    ("GET", "/"): Budget(0),
+}
+
+
+@pytest.mark.parametrize("method, template", sorted(BUDGETS), ids=[" ".join(key) for key in sorted(BUDGETS)])
+def test_route_budget(client: TestClient, query_recorder, data, method: str, template: str):
+    budget = BUDGETS[(method, template)]
+    kwargs = budget.request(client, data)
+    path = template.format(**kwargs.pop("path_params", {}))
+    with query_recorder.budget(budget.statements, budget.allow_scans):
+        response = client.request(method, path, **kwargs)
+    assert response.status_code == budget.status_code, response.text
+
+
+def test_recorder_detects_full_scans(query_recorder):
+    query_recorder.statements.append(("SELECT id FROM workouts WHERE name = ?", ("x",)))
+    query_recorder.statements.append(("SELECT id FROM workouts WHERE id = ?", (1,)))
+    query_recorder.statements.append(("SELECT user_id FROM user_stats", ()))
+    assert [table for table, _ in query_recorder.full_scans()] == ["workouts"]
+    assert query_recorder.full_scans(allow_scans={"workouts"}) == []
+
+
+def test_every_route_has_a_budget():
+    routes = {
+        (method, route.path)
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    assert routes == set(BUDGETS)
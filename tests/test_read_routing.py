@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import OperationalError
+
+from fixture import setup_test_db, registered_user, client, async_engine, read_engine, TestingReadSessionLocal
+from models.workouts import Workout
+from schemas.workouts import WorkoutType
+
+
+class EngineStatements:
+    """Запросы, выполненные через движки записи и чтения, по отдельности."""
+
+    def __init__(self):
+        self.by_engine = {"write": [], "read": []}
+        self.engines = {"write": async_engine.sync_engine, "read": read_engine.sync_engine}
+        self.listeners = {name: self.listener(name) for name in self.engines}
+
+    def listener(self, name):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            self.by_engine[name].append(statement)
+        return before_cursor_execute
+
+    def __enter__(self):
+        for name, sync_engine in self.engines.items():
+            event.listen(sync_engine, "before_cursor_execute", self.listeners[name])
+        return self.by_engine
+
+    def __exit__(self, *exc_info):
+        for name, sync_engine in self.engines.items():
+            event.remove(sync_engine, "before_cursor_execute", self.listeners[name])
+
+
+def test_get_reads_through_read_engine(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    with EngineStatements() as statements:
+        workout_id = client.post("/workouts", json={"name": "Routed", "duration_minutes": 15,
+                                                    "workout_type": WorkoutType.cardio}, headers=headers).json()["id"]
+    assert statements["write"] and not statements["read"]
+
+    with EngineStatements() as statements:
+        assert client.get(f"/workouts/{workout_id}", headers=headers).json()["name"] == "Routed"
+        assert client.get(f"/users/{registered_user['email']}", headers=headers).status_code == 200
+        assert client.get("/workouts/export?format=csv", headers=headers).status_code == 200
+    assert statements["read"] and not statements["write"]
+
+
+def test_read_session_switches_to_writer_after_write(registered_user):
+    async def run():
+        async with TestingReadSessionLocal() as db:
+            with EngineStatements() as statements:
+                await db.execute(select(Workout.id).limit(1))
+                assert len(statements["read"]) == 1 and not statements["write"]
+
+                db.add(Workout(name="Read your writes", duration_minutes=5, workout_type=WorkoutType.cardio,
+                               user_id=1))
+                await db.flush()
+                # После записи сессия читает из писателя и видит собственную незакоммиченную строку
+                names = (await db.execute(select(Workout.name).where(Workout.name == "Read your writes"))).scalars()
+                assert names.all() == ["Read your writes"]
+                assert len(statements["read"]) == 1
+            await db.rollback()
+
+    asyncio.run(run())
+
+
+def test_read_engine_rejects_writes():
+    async def run():
+        async with read_engine.connect() as conn:
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(text("DELETE FROM workouts"))
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+import asyncio
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from fixture import setup_test_db, client, engine, TestingSessionLocal
+from core.database import Base
+from models.associations import workout_exercises
+from models.users import User
+from models.workouts import Workout
+from schemas.workouts import WorkoutType
+from services.seed import SEED_PASSWORD, parse_distribution, parse_type_mix, seed_database
+from services.user_stats import verify_user_stats
+
+
+def snapshot():
+    with engine.connect() as conn:
+        return {table: conn.execute(select(table).order_by(*table.primary_key.columns)).all()
+                for table in (User.__table__, Workout.__table__, workout_exercises)}
+
+
+def test_seed_is_deterministic_and_consistent(client: TestClient):
+    report = seed_database(engine, users=30, exercises=40, workouts_per_user="uniform:0-6",
+                           exercises_per_workout="uniform:1-3", workout_types="strength=1,cardio=1",
+                           seed=11, batch_size=50, defer_indexes=True)
+    assert report["users"] == 30 and report["exercises"] == 40
+    first = snapshot()
+    assert {row.workout_type for row in first[Workout.__table__]} <= {"strength", "cardio"}
+    assert report["workouts"] == len(first[Workout.__table__])
+
+    async def verify():
+        async with TestingSessionLocal() as db:
+            return await verify_user_stats(db)
+
+    assert asyncio.run(verify()) == []
+    with engine.connect() as conn:
+        indexes = {name for (name,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert "ix_workouts_user_id_created_at_id" in indexes
+        assert conn.execute(text("SELECT count(*) FROM exercises_fts WHERE exercises_fts MATCH 'barbell'")).scalar()
+
+    response = client.post("/auth/login", params={"email": "user1@seed.example", "password": SEED_PASSWORD})
+    assert response.status_code == 200
+
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    seed_database(engine, users=30, exercises=40, workouts_per_user="uniform:0-6",
+                  exercises_per_workout="uniform:1-3", workout_types="strength=1,cardio=1", seed=11)
+    assert snapshot() == first
+
+
+def test_seed_distributions():
+    rng = random.Random(0)
+    assert parse_distribution("fixed:3")(rng) == 3
+    assert {parse_distribution("uniform:2-4")(rng) for _ in range(100)} == {2, 3, 4}
+    samples = [parse_distribution("geometric:20")(rng) for _ in range(20000)]
+    assert 19 < sum(samples) / len(samples) < 21
+
+    assert parse_type_mix("cardio=3,strength=1", WorkoutType) == ([WorkoutType.cardio, WorkoutType.strength],
+                                                                 [3.0, 4.0])
+    for spec in ("poisson:3", "uniform:5-2", "fixed:x"):
+        with pytest.raises(ValueError):
+            parse_distribution(spec)
+    with pytest.raises(ValueError):
+        parse_type_mix("running=1", WorkoutType)
@@ -0,0 +1,28 @@
+import os
+import runpy
+
+from fixture import setup_test_db
+from core.database import async_engine, engine
+
+GUNICORN_CONF = os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py")
+
+
+def test_gunicorn_config(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    config = runpy.run_path(GUNICORN_CONF)
+    assert config["workers"] == 3
+    assert config["worker_class"].endswith("UvicornWorker")
+    assert config["preload_app"]
+    assert config["max_requests"] > 0 and config["max_requests_jitter"] > 0
+
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    assert runpy.run_path(GUNICORN_CONF)["workers"] == config["available_cores"]() >= 1
+
+
+def test_post_fork_replaces_pools():
+    pools = engine.pool, async_engine.sync_engine.pool
+    with engine.connect():
+        runpy.run_path(GUNICORN_CONF)["post_fork"](None, None)
+    assert engine.pool is not pools[0]
+    assert async_engine.sync_engine.pool is not pools[1]
+    assert type(engine.pool) is type(pools[0])
@@ -1,8 +1,16 @@
+import asyncio
+
 import faker
 from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import create_engine, text
 
-from fixture import registered_user, client
+from fixture import setup_test_db, registered_user, client, sql_statements, TestingSessionLocal
+from core.config import ALGORITHM, SECRET_KEY, SQLALCHEMY_TEST_DATABASE_URL
+from core.security import create_access_token
 from schemas.users import UserExperience, UserGoal
+from schemas.workouts import WorkoutType
+from services.users import purge_workouts
 
 fake = faker.Faker()
 
@@ -44,7 +52,7 @@ def test_get_users_list(client: TestClient, registered_user):
     response = client.get("/users", headers=headers)
 
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) >= 1
     assert any(u["email"] == registered_user["email"] for u in data)
 
@@ -88,3 +96,135 @@ def test_delete_user(client: TestClient, registered_user):
 
     response = client.delete(f"/users/{registered_user['email']}", headers=headers)
     assert response.status_code == 204 or response.status_code == 200
+
+
+def create_history(client: TestClient, headers: dict, workouts: int) -> tuple[list[int], int]:
+    workout_ids = [client.post("/workouts", json={"name": f"History {i}", "duration_minutes": 10,
+                                                  "workout_type": WorkoutType.strength}, headers=headers).json()["id"]
+                   for i in range(workouts)]
+    exercise_id = client.post(f"/workouts/{workout_ids[0]}/exercises", json={
+        "name": "Shared squat", "calories_per_minute": 6, "exercise_type": "strength"}, headers=headers).json()["id"]
+    for workout_id in workout_ids[1:]:
+        client.post(f"/workouts/{workout_id}/add-exercise", params={"exercise_id": exercise_id}, headers=headers)
+    return workout_ids, exercise_id
+
+
+def remaining_rows(workout_ids: list[int], exercise_id: int) -> dict:
+    engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL)
+    ids = ", ".join(map(str, workout_ids))
+    with engine.connect() as conn:
+        counts = {table: conn.execute(text(f"SELECT count(*) FROM {table} WHERE {column} IN ({ids})")).scalar()
+                  for table, column in (("workouts", "id"), ("workout_exercises", "workout_id"))}
+        counts["exercises"] = conn.execute(text(f"SELECT count(*) FROM exercises WHERE id = {exercise_id}")).scalar()
+    engine.dispose()
+    return counts
+
+
+def test_delete_user_removes_workouts(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    workout_ids, exercise_id = create_history(client, headers, 3)
+
+    assert client.delete(f"/users/{registered_user['email']}").status_code == 204
+    # Упражнения общие: удаляются только связи с ними
+    assert remaining_rows(workout_ids, exercise_id) == {"workouts": 0, "workout_exercises": 0, "exercises": 1}
+    assert client.delete(f"/users/{registered_user['email']}").status_code == 404
+
+
+def test_delete_user_purges_large_history_in_background(client: TestClient, registered_user, monkeypatch):
+    monkeypatch.setattr("routes.users.USER_DELETE_SYNC_MAX_WORKOUTS", 2)
+    monkeypatch.setattr("services.users.USER_PURGE_CHUNK_SIZE", 2)
+    headers = {"Authorization": registered_user["token"]}
+    workout_ids, exercise_id = create_history(client, headers, 5)
+
+    # TestClient выполняет фоновые задачи до возврата ответа
+    response = client.delete(f"/users/{registered_user['email']}")
+    assert response.status_code == 202
+    assert response.json()["workouts"] == 5
+    assert client.get("/workouts", headers=headers).status_code == 401
+    assert remaining_rows(workout_ids, exercise_id) == {"workouts": 0, "workout_exercises": 0, "exercises": 1}
+
+
+def test_purge_workouts_reports_progress(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    create_history(client, headers, 5)
+    user_id = client.get("/workouts", headers=headers).json()["items"][0]["user_id"]
+
+    progress = []
+    deleted = asyncio.run(purge_workouts(TestingSessionLocal, user_id, chunk_size=2,
+                                         on_progress=lambda *counts: progress.append(counts)))
+    assert deleted == 5
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+
+
+def test_token_revoked_after_update(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    updated_data = {
+        "name": fake.last_name(),
+        "email": fake.email(),
+        "password": fake.password(),
+        "experience_level": fake.enum(UserExperience),
+        "goal": fake.enum(UserGoal)
+    }
+    response = client.put(f"/users/{registered_user['email']}", json=updated_data, headers=headers)
+    assert response.status_code == 200
+
+    # После изменения профиля старый токен больше не принимается
+    response = client.get("/workouts", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+
+def test_token_rejected_after_delete(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    response = client.delete(f"/users/{registered_user['email']}", headers=headers)
+    assert response.status_code == 204
+
+    assert client.get("/workouts", headers=headers).status_code == 401
+
+
+def test_legacy_token_revoked_after_update(client: TestClient, registered_user):
+    # Токен старого формата: только email, без uid и epoch
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': registered_user['email']})}"}
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    updated_data = {**registered_user, "password": fake.password()}
+    response = client.put(f"/users/{registered_user['email']}", json=updated_data,
+                          headers={"Authorization": registered_user["token"]})
+    assert response.status_code == 200
+
+    # Email не менялся, но смена пароля отзывает и токены старого формата
+    response = client.get("/workouts", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+
+def test_legacy_token_cached_after_first_lookup(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': registered_user['email']})}"}
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    # Как и новый токен, токен старого формата ищет пользователя в БД только один раз
+    sql_statements.clear()
+    assert client.get("/workouts", headers=headers).status_code == 200
+    assert not any("FROM users" in statement for statement in sql_statements)
+
+
+def test_token_without_exp_is_accepted(client: TestClient, registered_user):
+    claims = jwt.decode(registered_user["token"].removeprefix("Bearer "), SECRET_KEY, algorithms=[ALGORITHM])
+    del claims["exp"]
+    token = jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+    assert client.get("/workouts", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_authenticated_request_skips_user_lookup(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": registered_user["token"]}
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    sql_statements.clear()
+    assert client.get("/workouts", headers=headers).status_code == 200
+
+    # Пользователь берётся из токена и кэша эпох, таблица users не читается
+    assert not any("FROM users" in statement for statement in sql_statements)
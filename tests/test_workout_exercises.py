@@ -1,6 +1,11 @@
+import asyncio
+
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from fixture import registered_user, client
+from core.config import SQLALCHEMY_TEST_ASYNC_DATABASE_URL
+from fixture import setup_test_db, registered_user, client, sql_statements
+from services.user_stats import rebuild_user_stats, verify_user_stats
 from schemas.exercises import ExerciseType
 from schemas.workouts import WorkoutType
 
@@ -48,7 +53,7 @@ def test_get_all_workouts(client: TestClient, registered_user):
 
     response = client.get("/workouts", headers=headers)
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
 
     assert len(data) >= 2
     assert any(item["name"] == workout1["name"] for item in data)
@@ -165,3 +170,107 @@ def test_create_exercise_linked_to_workout(client: TestClient, registered_user):
     workout_details = client.get(f"/workouts/{workout_id}", headers=headers)
     assert len(workout_details.json()["exercises"]) >= 1
     assert any(e["name"] == "Jumping Jacks" for e in workout_details.json()["exercises"])
+
+
+def test_workouts_list_query_count_does_not_grow(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": registered_user["token"]}
+
+    def create_workout_with_exercise(i):
+        workout_response = client.post("/workouts", json={
+            "name": f"Workout {i}",
+            "duration_minutes": 30,
+            "workout_type": WorkoutType.strength
+        }, headers=headers)
+        workout_id = workout_response.json()["id"]
+        client.post(f"/workouts/{workout_id}/exercises", json={
+            "name": f"Exercise {i}",
+            "calories_per_minute": 5,
+            "exercise_type": ExerciseType.strength
+        }, headers=headers)
+        return workout_id
+
+    workout_id = create_workout_with_exercise(0)
+
+    sql_statements.clear()
+    assert client.get("/workouts", headers=headers).status_code == 200
+    statements_for_one = len(sql_statements)
+
+    for i in range(1, 10):
+        create_workout_with_exercise(i)
+
+    sql_statements.clear()
+    response = client.get("/workouts", headers=headers)
+    assert response.status_code == 200
+    assert all(len(w["exercises"]) == 1 for w in response.json()["items"])
+
+    # Упражнения всех тренировок страницы грузятся одним запросом, а не по запросу на тренировку
+    assert len(sql_statements) == statements_for_one
+    # версия списка для ETag, тренировки, связи, упражнения
+    assert len(sql_statements) <= 4
+
+    sql_statements.clear()
+    assert client.get(f"/workouts/{workout_id}", headers=headers).status_code == 200
+    assert len(sql_statements) <= 3
+
+
+def run_with_session(operation):
+    async def run():
+        engine = create_async_engine(SQLALCHEMY_TEST_ASYNC_DATABASE_URL)
+        async with async_sessionmaker(bind=engine, class_=AsyncSession)() as db:
+            result = await operation(db)
+        await engine.dispose()
+        return result
+
+    return asyncio.run(run())
+
+
+def test_workout_summary_follows_writes(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+
+    summary = client.get("/workouts/summary", headers=headers).json()
+    assert summary["total_workouts"] == 0
+
+    first = client.post("/workouts", json={"name": "A", "duration_minutes": 30,
+                                           "workout_type": WorkoutType.cardio}, headers=headers).json()
+    second = client.post("/workouts", json={"name": "B", "duration_minutes": 10,
+                                            "workout_type": WorkoutType.strength}, headers=headers).json()
+    exercise = client.post(f"/workouts/{first['id']}/exercises", json={
+        "name": "Run", "calories_per_minute": 10, "exercise_type": ExerciseType.cardio}, headers=headers).json()
+    client.post(f"/workouts/{second['id']}/add-exercise", params={"exercise_id": exercise["id"]}, headers=headers)
+
+    # 30 * 10 + 10 * 10
+    summary = client.get("/workouts/summary", headers=headers).json()
+    assert summary["total_workouts"] == 2
+    assert summary["total_minutes"] == 40
+    assert summary["total_calories"] == 400
+    assert summary["by_type"] == {"strength": 1, "cardio": 1, "flexibility": 0}
+    assert summary["last_workout_at"] == second["created_at"]
+
+    client.put(f"/workouts/{second['id']}", json={"name": "B", "duration_minutes": 20,
+                                                  "workout_type": WorkoutType.flexibility}, headers=headers)
+    client.put(f"/workouts/{first['id']}/exercises/{exercise['id']}", json={
+        "name": "Run", "calories_per_minute": 12, "exercise_type": ExerciseType.cardio}, headers=headers)
+
+    # 30 * 12 + 20 * 12
+    summary = client.get("/workouts/summary", headers=headers).json()
+    assert summary["total_minutes"] == 50
+    assert summary["total_calories"] == 600
+    assert summary["by_type"] == {"strength": 0, "cardio": 1, "flexibility": 1}
+
+    client.delete(f"/workouts/{first['id']}/exercises/{exercise['id']}", headers=headers)
+    client.delete(f"/workouts/{second['id']}", headers=headers)
+
+    summary = client.get("/workouts/summary", headers=headers).json()
+    assert summary["total_workouts"] == 1
+    assert summary["total_minutes"] == 30
+    assert summary["total_calories"] == 0
+    assert summary["last_workout_at"] == first["created_at"]
+
+    assert run_with_session(verify_user_stats) == []
+
+    etag = client.get("/workouts", headers=headers).headers["ETag"]
+    run_with_session(rebuild_user_stats)
+    assert run_with_session(verify_user_stats) == []
+    assert client.get("/workouts/summary", headers=headers).json() == summary
+    # Пересборка не возвращает версию списка назад
+    assert client.get("/workouts", headers=headers).headers["ETag"] != etag
@@ -1,8 +1,13 @@
+import csv
+import json
+
 import faker
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
 
-from fixture import registered_user, client
-from schemas.workouts import WorkoutType
+from fixture import setup_test_db, registered_user, client, sql_statements
+from core.config import SQLALCHEMY_TEST_DATABASE_URL
+from schemas.workouts import WorkoutPage, WorkoutResponse, WorkoutType
 
 fake = faker.Faker()
 
@@ -28,6 +33,41 @@ def test_create_workout(client: TestClient, registered_user):
     assert "created_at" in data
 
 
+def test_create_workouts_bulk(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    payload = [
+        {"name": "Bulk 1", "duration_minutes": 20, "workout_type": WorkoutType.cardio},
+        {"name": "Bulk invalid", "workout_type": WorkoutType.cardio},
+        {
+            "name": "Bulk 2",
+            "duration_minutes": 40,
+            "workout_type": WorkoutType.strength,
+            "exercises": [
+                {"name": "Squats", "calories_per_minute": 7, "exercise_type": "strength"},
+                {"name": "Lunges", "calories_per_minute": 6, "exercise_type": "strength"}
+            ]
+        }
+    ]
+
+    response = client.post("/workouts/bulk", json=payload, headers=headers)
+    assert response.status_code == 201
+    data = response.json()
+
+    # id возвращаются в порядке входного списка, невалидный элемент не прерывает пакет
+    assert len(data["ids"]) == 3
+    assert data["ids"][1] is None
+    assert [e["index"] for e in data["errors"]] == [1]
+    assert data["errors"][0]["errors"][0]["loc"] == ["duration_minutes"]
+
+    first = client.get(f"/workouts/{data['ids'][0]}", headers=headers).json()
+    assert first["name"] == "Bulk 1"
+    assert first["exercises"] == []
+
+    second = client.get(f"/workouts/{data['ids'][2]}", headers=headers).json()
+    assert second["name"] == "Bulk 2"
+    assert sorted(e["name"] for e in second["exercises"]) == ["Lunges", "Squats"]
+
+
 def test_get_all_workouts(client: TestClient, registered_user):
     headers = {"Authorization": registered_user["token"]}
 
@@ -50,13 +90,53 @@ def test_get_all_workouts(client: TestClient, registered_user):
 
     response = client.get("/workouts", headers=headers)
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
 
     assert len(data) >= 2
     assert any(item["name"] == workout1["name"] for item in data)
     assert any(item["name"] == workout2["name"] for item in data)
 
 
+def test_get_workouts_paginated(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+
+    created_ids = []
+    for i in range(5):
+        response = client.post("/workouts", json={
+            "name": f"Paged Workout {i}",
+            "duration_minutes": 20,
+            "workout_type": fake.enum(WorkoutType)
+        }, headers=headers)
+        assert response.status_code == 201
+        created_ids.append(response.json()["id"])
+
+    # Проходим все страницы по курсору
+    seen_ids = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/workouts", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen_ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # От новых к старым, без повторов и пропусков
+    assert seen_ids == list(reversed(created_ids))
+
+
+def test_get_workouts_invalid_cursor(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+
+    response = client.get("/workouts", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
 def test_get_workout_by_id(client: TestClient, registered_user):
     headers = {"Authorization": registered_user["token"]}
 
@@ -131,3 +211,206 @@ def test_delete_workout(client: TestClient, registered_user):
     # Проверяем, что не существует
     get_response = client.get(f"/workouts/{workout_id}", headers=headers)
     assert get_response.status_code == 404
+
+
+def test_export_workouts(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    payload = [
+        {"name": "Export 1", "duration_minutes": 20, "workout_type": WorkoutType.cardio},
+        {
+            "name": "Export 2",
+            "duration_minutes": 40,
+            "workout_type": WorkoutType.strength,
+            "exercises": [
+                {"name": "Squats", "calories_per_minute": 7, "exercise_type": "strength"},
+                {"name": "Lunges", "calories_per_minute": 6, "exercise_type": "strength"}
+            ]
+        }
+    ]
+    assert client.post("/workouts/bulk", json=payload, headers=headers).status_code == 201
+
+    response = client.get("/workouts/export", params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["name"] for r in records] == ["Export 1", "Export 2"]
+    assert records[0]["exercises"] == []
+    assert sorted(e["name"] for e in records[1]["exercises"]) == ["Lunges", "Squats"]
+
+    response = client.get("/workouts/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert len(rows) == 3
+    assert rows[0]["workout_name"] == "Export 1" and rows[0]["exercise_id"] == ""
+    assert {r["exercise_name"] for r in rows[1:]} == {"Squats", "Lunges"}
+
+
+def test_import_workouts(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    ndjson = "\n".join([
+        json.dumps({"name": "Imported 1", "duration_minutes": 25, "workout_type": "cardio"}),
+        "{broken json",
+        json.dumps({"name": "Imported 2", "duration_minutes": 35, "workout_type": "strength",
+                    "exercises": [{"name": "Deadlift", "calories_per_minute": 9, "exercise_type": "strength"}]}),
+        json.dumps({"name": "No duration", "workout_type": "cardio"}),
+    ])
+
+    response = client.post("/workouts/import", params={"format": "ndjson"}, content=ndjson, headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["processed"] == 4
+    assert report["imported"] == 2
+    assert report["failed"] == 2
+    assert [e["row"] for e in report["errors"]] == [2, 4]
+
+    # Выгрузка в CSV импортируется обратно без потерь
+    exported = client.get("/workouts/export", params={"format": "csv"}, headers=headers).text
+    response = client.post("/workouts/import", params={"format": "csv"}, content=exported, headers=headers)
+    assert response.json() == {"processed": 2, "imported": 2, "failed": 0, "errors": []}
+
+    records = [json.loads(line) for line in client.get("/workouts/export", headers=headers).text.splitlines()]
+    assert [r["name"] for r in records] == ["Imported 1", "Imported 2", "Imported 1", "Imported 2"]
+    assert [e["name"] for e in records[3]["exercises"]] == ["Deadlift"]
+
+
+def test_workout_stats(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    payload = [
+        {"name": "Stats 1", "duration_minutes": 30, "workout_type": WorkoutType.cardio,
+         "exercises": [{"name": "Run", "calories_per_minute": 10, "exercise_type": "cardio"},
+                       {"name": "Jump", "calories_per_minute": 5, "exercise_type": "cardio"}]},
+        {"name": "Stats 2", "duration_minutes": 20, "workout_type": WorkoutType.strength,
+         "exercises": [{"name": "Press", "calories_per_minute": 6, "exercise_type": "strength"}]},
+        {"name": "Stats 3", "duration_minutes": 15, "workout_type": WorkoutType.cardio},
+    ]
+    assert client.post("/workouts/bulk", json=payload, headers=headers).status_code == 201
+
+    for bucket in ("day", "week", "month"):
+        response = client.get("/workouts/stats", params={"bucket": bucket}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["bucket"] == bucket
+        assert data["totals"] == {
+            "period": None,
+            "workouts": 3,
+            "total_minutes": 65,
+            "calories": 30 * (10 + 5) + 20 * 6,
+            "by_type": {"cardio": 2, "strength": 1},
+        }
+        assert len(data["periods"]) == 1
+        assert data["periods"][0]["workouts"] == 3
+
+    response = client.get("/workouts/stats", params={"date_to": "2000-01-01"}, headers=headers)
+    assert response.json()["totals"]["workouts"] == 0
+
+
+def test_workout_etag(client: TestClient, registered_user, sql_statements):
+    headers = {"Authorization": registered_user["token"]}
+    workout_id = client.post("/workouts", json={"name": "Polled", "duration_minutes": 20,
+                                                "workout_type": WorkoutType.cardio}, headers=headers).json()["id"]
+
+    response = client.get(f"/workouts/{workout_id}", headers=headers)
+    etag = response.headers["ETag"]
+    list_etag = client.get("/workouts", headers=headers).headers["ETag"]
+
+    # Неизменившаяся тренировка: 304 после чтения одной строки, без упражнений и сериализации
+    sql_statements.clear()
+    response = client.get(f"/workouts/{workout_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert len(sql_statements) == 1
+    response = client.get("/workouts", headers={**headers, "If-None-Match": f'"other", W/{list_etag}'})
+    assert response.status_code == 304
+
+    # Новое упражнение в тренировке меняет оба ETag
+    exercise_id = client.post(f"/workouts/{workout_id}/exercises", json={
+        "name": "Rope", "calories_per_minute": 12, "exercise_type": "cardio"}, headers=headers).json()["id"]
+    response = client.get(f"/workouts/{workout_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    etag = response.headers["ETag"]
+    response = client.get("/workouts", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+    list_etag = response.headers["ETag"]
+
+    # Изменение упражнения меняет ETag тренировок, в которые оно входит
+    client.put(f"/workouts/{workout_id}/exercises/{exercise_id}", json={
+        "name": "Jump rope", "calories_per_minute": 12, "exercise_type": "cardio"}, headers=headers)
+    response = client.get(f"/workouts/{workout_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["exercises"][0]["name"] == "Jump rope"
+    etag = response.headers["ETag"]
+    assert client.get("/workouts", headers={**headers, "If-None-Match": list_etag}).status_code == 200
+
+    client.put(f"/workouts/{workout_id}", json={"name": "Polled", "duration_minutes": 25,
+                                                "workout_type": WorkoutType.cardio}, headers=headers)
+    assert client.get(f"/workouts/{workout_id}", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_workout_list_etag_per_page(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    for i in range(3):
+        client.post("/workouts", json={"name": f"Paged {i}", "duration_minutes": 20,
+                                       "workout_type": WorkoutType.cardio}, headers=headers)
+
+    first = client.get("/workouts", params={"limit": 2}, headers=headers)
+    second = client.get("/workouts", params={"limit": 2, "cursor": first.json()["next_cursor"]}, headers=headers)
+    other_size = client.get("/workouts", params={"limit": 3}, headers=headers)
+    etags = {first.headers["ETag"], second.headers["ETag"], other_size.headers["ETag"]}
+    assert len(etags) == 3
+
+    # ETag первой страницы не подтверждает вторую и страницу другого размера
+    response = client.get("/workouts", params={"limit": 2, "cursor": first.json()["next_cursor"]},
+                          headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json() == second.json()
+    response = client.get("/workouts", params={"limit": 3}, headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    response = client.get("/workouts", params={"limit": 2, "cursor": first.json()["next_cursor"]},
+                          headers={**headers, "If-None-Match": second.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_workout_etag_after_change_in_another_worker(client: TestClient, registered_user):
+    headers = {"Authorization": registered_user["token"]}
+    workout_id = client.post("/workouts", json={"name": "Shared", "duration_minutes": 20,
+                                                "workout_type": WorkoutType.cardio}, headers=headers).json()["id"]
+    exercise_id = client.post(f"/workouts/{workout_id}/exercises", json={
+        "name": "Rope", "calories_per_minute": 12, "exercise_type": "cardio"}, headers=headers).json()["id"]
+    etag = client.get(f"/workouts/{workout_id}", headers=headers).headers["ETag"]
+    list_etag = client.get("/workouts", headers=headers).headers["ETag"]
+
+    # Другой воркер меняет упражнение: кэш этого процесса о записи не знает
+    engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE exercises SET name = 'Jump rope', version = version + 1 WHERE id = :id"),
+                     {"id": exercise_id})
+        conn.execute(text("UPDATE workouts SET version = version + 1 WHERE id = :id"), {"id": workout_id})
+        conn.execute(text("UPDATE user_stats SET workouts_version = workouts_version + 1 "
+                          "WHERE user_id = (SELECT user_id FROM workouts WHERE id = :id)"), {"id": workout_id})
+    engine.dispose()
+
+    # Новый ETag приходит только с новым телом, а с ним повторный запрос получает 304
+    response = client.get(f"/workouts/{workout_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["exercises"][0]["name"] == "Jump rope"
+    assert client.get(f"/workouts/{workout_id}",
+                      headers={**headers, "If-None-Match": response.headers["ETag"]}).status_code == 304
+    response = client.get("/workouts", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert next(w for w in response.json()["items"] if w["id"] == workout_id)["exercises"][0]["name"] == "Jump rope"
+
+
+def test_workout_responses_match_schema(client: TestClient, registered_user):
+    # Ответы кодируются без валидации по response_model, поэтому их форму проверяет тест
+    headers = {"Authorization": registered_user["token"]}
+    workout_id = client.post("/workouts", json={"name": "Shape", "duration_minutes": 15,
+                                                "workout_type": WorkoutType.flexibility}, headers=headers).json()["id"]
+    client.post(f"/workouts/{workout_id}/exercises", json={
+        "name": "Stretch", "calories_per_minute": 3, "exercise_type": "flexibility"}, headers=headers)
+
+    workout = client.get(f"/workouts/{workout_id}", headers=headers).json()
+    assert WorkoutResponse.model_validate(workout).model_dump(mode="json") == workout
+    page = client.get("/workouts", headers=headers).json()
+    assert WorkoutPage.model_validate(page).model_dump(mode="json") == page